@@ -1,7 +1,6 @@
 from datetime import datetime, timedelta, timezone
 import json
 import os
-import shutil
 from typing import Optional
 from app.db.models.banner import Banners, Category
 from app.db.models.orders import (
@@ -19,15 +18,41 @@ from app.schemas.response import (
     ProductReviewCreate,
     ProductTagCreate,
 )
+from app.services.catalog_service import get_product_sort, refresh_catalog
 from app.services.modal_services import create_record, update_record
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from app.services.order_document_service import get_order_document_stats
+from app.services.order_summary_service import append_order_status, get_invoice_url
+from app.services.pricing_service import refresh_pricing
+from app.services.similarity_service import queue_similar_products_refresh
+from app.services.storage_service import get_media_storage
+from app.services.rating_service import (
+    COUNTED_STATUS,
+    apply_rating_delta,
+    rebuild_rating_summaries,
+    validate_rating,
+)
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    UploadFile,
+    File,
+    Form,
+    Query,
+    Response,
+)
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import Settings
 from app.core import security
-from app.db.session import get_db
+from app.db.loading_profiles import product_query
+from app.db.session import get_async_db, get_db
 from fastapi import HTTPException, status
 from typing import List
 from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from app.utils.pagination import clamp_limit, keyset_paginate, set_page_headers
 
 
 router = APIRouter()
@@ -40,27 +65,33 @@ async def upload_banner(
     file: UploadFile = File(...),
     file_mobile: UploadFile = File(...),
     banner_priority: int = 0,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
         file_path = os.path.join(setting.BANNER_DIR, file.filename)
         # Save File to Disk
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await run_in_threadpool(
+            get_media_storage().put_stream, file_path, file.file, file.content_type
+        )
 
         file_path_mobile = os.path.join(setting.BANNER_DIR, file_mobile.filename)
         # Save File to Disk
-        with open(file_path_mobile, "wb") as buffer:
-            shutil.copyfileobj(file_mobile.file, buffer)
+        await run_in_threadpool(
+            get_media_storage().put_stream,
+            file_path_mobile,
+            file_mobile.file,
+            file_mobile.content_type,
+        )
 
         # Save Metadata to DB
-        create_record(
-            db,
+        await db.run_sync(
+            create_record,
             Banners,
             banner_name=setting.BANNER_DIR + "/" + file.filename,
             banner_mobile=setting.BANNER_DIR + "/" + file_mobile.filename,
             banner_priority=banner_priority,
         )
+        await db.run_sync(refresh_catalog)
         return {"message": "Banner uploaded successfully", "filename": file.filename}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -89,9 +120,9 @@ def delete_banner(banner_id: int, db: Session = Depends(get_db)):
         db.commit()
 
         # Optionally, delete the file from the filesystem
-        if os.path.exists(banner.banner_name):
-            os.remove(banner.banner_name)
+        get_media_storage().delete(banner.banner_name)
 
+        refresh_catalog(db)
         return {"message": "Banner deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -114,23 +145,31 @@ async def create_category(
     cat_priority: int = Form(...),
     cat_img: UploadFile = File(...),  # Image file input
     cat_mobile_img: UploadFile = File(...),  # Image file input
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
         # Save the image
         file_path = os.path.join(setting.CATEGORY_DIR, cat_img.filename)
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(cat_img.file, buffer)
+        await run_in_threadpool(
+            get_media_storage().put_stream,
+            file_path,
+            cat_img.file,
+            cat_img.content_type,
+        )
 
         file_path_mobile = os.path.join(setting.CATEGORY_DIR, cat_mobile_img.filename)
 
-        with open(file_path_mobile, "wb") as buffer:
-            shutil.copyfileobj(cat_mobile_img.file, buffer)
+        await run_in_threadpool(
+            get_media_storage().put_stream,
+            file_path_mobile,
+            cat_mobile_img.file,
+            cat_mobile_img.content_type,
+        )
 
         # Create DB entry
-        create_record(
-            db,
+        await db.run_sync(
+            create_record,
             Category,
             cat_name=cat_name,
             cat_priority=cat_priority,
@@ -139,6 +178,7 @@ async def create_category(
             + "/"
             + cat_mobile_img.filename,  # Store image path
         )
+        await db.run_sync(refresh_catalog)
         return {"message": "Category created successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -152,10 +192,10 @@ async def update_category(
     cat_priority: int = Form(...),
     cat_img: Optional[UploadFile] = File(None),
     cat_mobile_img: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        category = db.query(Category).filter(Category.id == category_id).first()
+        category = await db.get(Category, category_id)
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
 
@@ -164,24 +204,32 @@ async def update_category(
 
         # Update cat_img if new file is provided
         if cat_img:
-            if cat_img_path and os.path.exists(cat_img_path):
-                os.remove(cat_img_path)
+            if cat_img_path:
+                await run_in_threadpool(get_media_storage().delete, cat_img_path)
             cat_img_path = os.path.join(setting.CATEGORY_DIR, cat_img.filename)
-            with open(cat_img_path, "wb") as buffer:
-                shutil.copyfileobj(cat_img.file, buffer)
+            await run_in_threadpool(
+                get_media_storage().put_stream,
+                cat_img_path,
+                cat_img.file,
+                cat_img.content_type,
+            )
 
         # Update cat_mobile_img if new file is provided
         if cat_mobile_img:
-            if cat_mobile_img_path and os.path.exists(cat_mobile_img_path):
-                os.remove(cat_mobile_img_path)
+            if cat_mobile_img_path:
+                await run_in_threadpool(get_media_storage().delete, cat_mobile_img_path)
             cat_mobile_img_path = os.path.join(
                 setting.CATEGORY_DIR, cat_mobile_img.filename
             )
-            with open(cat_mobile_img_path, "wb") as buffer:
-                shutil.copyfileobj(cat_mobile_img.file, buffer)
+            await run_in_threadpool(
+                get_media_storage().put_stream,
+                cat_mobile_img_path,
+                cat_mobile_img.file,
+                cat_mobile_img.content_type,
+            )
 
-        update_record(
-            db,
+        await db.run_sync(
+            update_record,
             Category,
             filters={"id": category_id},
             updates={
@@ -191,6 +239,7 @@ async def update_category(
                 "cat_mobile_img": cat_mobile_img_path,
             },
         )
+        await db.run_sync(refresh_catalog)
         return {"message": "Category updated successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -209,9 +258,9 @@ def delete_category(category_id: int, db: Session = Depends(get_db)):
         db.commit()
 
         # Optionally, delete the file from the filesystem
-        if os.path.exists(category.cat_img):
-            os.remove(category.cat_img)
+        get_media_storage().delete(category.cat_img)
 
+        refresh_catalog(db)
         return {"message": "Category deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -237,19 +286,23 @@ async def create_product(
     product_trading_type: Optional[str] = Form(None),
     is_digital: Optional[bool] = Form(False),
     product_images: UploadFile = File(...),  # Image file input
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
         # Save the image
         file_path = os.path.join(setting.product_DIR, product_images.filename)
 
         # image_path = f"images/products/{product_images.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(product_images.file, buffer)
+        await run_in_threadpool(
+            get_media_storage().put_stream,
+            file_path,
+            product_images.file,
+            product_images.content_type,
+        )
 
         # Create DB entry
-        create_record(
-            db,
+        product = await db.run_sync(
+            create_record,
             Products,
             product_name=product_name,
             url_name=url_name,
@@ -269,6 +322,11 @@ async def create_product(
             product_category=product_category,
             product_trading_type=product_trading_type,
         )
+        await db.run_sync(refresh_catalog)
+        # the new product joins its category's similar products; queueing only
+        # adds a jobs row, which the AsyncSession takes directly
+        queue_similar_products_refresh(db, [product.id], product_category)
+        await db.commit()
         return {"message": "Product created successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -295,25 +353,30 @@ async def update_product(
     is_digital: Optional[bool] = Form(False),
     product_status: Optional[bool] = Form(True),
     product_images: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        product = db.query(Products).filter(Products.id == product_id).first()
+        product = await db.get(Products, product_id)
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
+        previous_category = product.product_category
 
         thumbnail_path = product.thumbnail
         if product_images:
             # Remove old image if exists
-            if thumbnail_path and os.path.exists(thumbnail_path):
-                os.remove(thumbnail_path)
+            if thumbnail_path:
+                await run_in_threadpool(get_media_storage().delete, thumbnail_path)
             # Save new image
             thumbnail_path = os.path.join(setting.product_DIR, product_images.filename)
-            with open(thumbnail_path, "wb") as buffer:
-                shutil.copyfileobj(product_images.file, buffer)
+            await run_in_threadpool(
+                get_media_storage().put_stream,
+                thumbnail_path,
+                product_images.file,
+                product_images.content_type,
+            )
 
-        update_record(
-            db,
+        await db.run_sync(
+            update_record,
             Products,
             filters={"id": product_id},
             updates={
@@ -336,16 +399,34 @@ async def update_product(
                 "product_trading_type": product_trading_type,
             },
         )
+        await db.run_sync(refresh_catalog)
+        queue_similar_products_refresh(db, [product_id], product_category)
+        if previous_category and previous_category != product_category:
+            # the old category loses a candidate
+            queue_similar_products_refresh(db, category=previous_category)
+        await db.commit()
         return {"message": "Product updated successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
 @router.get("/products/list/")
-def get_product_list(db: Session = Depends(get_db)):
+def get_product_list(
+    response: Response,
+    sort: str = "priority",
+    cursor: Optional[str] = None,
+    limit: int = setting.PAGE_SIZE_DEFAULT,
+    db: Session = Depends(get_db),
+):
     try:
-        products = db.query(Products).all()
-        return products
+        page = keyset_paginate(
+            product_query(db),
+            get_product_sort(sort),
+            cursor,
+            clamp_limit(limit, setting.PAGE_SIZE_MAX),
+        )
+        set_page_headers(response, page)
+        return page.items
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
@@ -354,34 +435,25 @@ def get_product_list(db: Session = Depends(get_db)):
 @router.get("/product/details/{product_id}")
 def get_product_details(product_id: int, db: Session = Depends(get_db)):
     try:
-        product = db.query(Products).filter(Products.id == product_id).first()
+        product = (
+            product_query(db, "admin").filter(Products.id == product_id).first()
+        )
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         product_dict = product.__dict__.copy()
         product_dict.pop("_sa_instance_state", None)
-        # Optionally, add related images
-        images = (
-            db.query(Product_images)
-            .filter(Product_images.product_id == product_id)
-            .all()
-        )
-        product_dict["images"] = [img.images for img in images]
-        # Optionally, add product reviews
-        reviews = (
-            db.query(Product_rating)
-            .filter(Product_rating.product_id == product_id)
-            .all()
-        )
+        # related images and reviews come from the admin loading profile
+        product_dict.pop("product_images", None)
+        product_dict.pop("product_ratings", None)
+        product_dict["images"] = [img.images for img in product.product_images]
         product_dict["reviews"] = []
-        for review in reviews:
+        for review in product.product_ratings:
             review_dict = review.__dict__.copy()
             review_dict.pop("_sa_instance_state", None)
-            review_images = (
-                db.query(Product_Review_images)
-                .filter(Product_Review_images.product_rating_id == review.id)
-                .all()
-            )
-            review_dict["images"] = [img.images for img in review_images]
+            review_dict.pop("product_review_images", None)
+            review_dict["images"] = [
+                img.images for img in review.product_review_images
+            ]
             product_dict["reviews"].append(review_dict)
         return product_dict
     except Exception as error:
@@ -392,7 +464,10 @@ def get_product_details(product_id: int, db: Session = Depends(get_db)):
 
 
 @router.delete("/products/delete/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db)):
+def delete_product(
+    product_id: int,
+    db: Session = Depends(get_db),
+):
     try:
         product = db.query(Products).filter(Products.id == product_id).first()
         if not product:
@@ -405,8 +480,7 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
             .all()
         )
         for img in images:
-            if os.path.exists(img.images):
-                os.remove(img.images)
+            get_media_storage().delete(img.images)
             db.delete(img)
 
         # Optionally, delete product reviews and their images
@@ -422,8 +496,7 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
                 .all()
             )
             for rimg in review_images:
-                if os.path.exists(rimg.images):
-                    os.remove(rimg.images)
+                get_media_storage().delete(rimg.images)
                 db.delete(rimg)
             db.delete(review)
 
@@ -460,8 +533,8 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
         for thickness in frame_thicknesses:
             db.delete(thickness)
         # Optionally, delete the product thumbnail from filesystem
-        if product.thumbnail and os.path.exists(product.thumbnail):
-            os.remove(product.thumbnail)
+        if product.thumbnail:
+            get_media_storage().delete(product.thumbnail)
 
         # Delete product_tag_options associated with this product
         product_tags = (
@@ -472,8 +545,22 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
         for tag in product_tags:
             db.delete(tag)
 
+        db.query(Product_rating_summary).filter(
+            Product_rating_summary.product_id == product_id
+        ).delete()
+        db.query(Similar_products).filter(
+            or_(
+                Similar_products.product_id == product_id,
+                Similar_products.similar_product_id == product_id,
+            )
+        ).delete(synchronize_session=False)
+
+        if product.product_category:
+            # committed with the delete
+            queue_similar_products_refresh(db, category=product.product_category)
         db.delete(product)
         db.commit()
+        refresh_catalog(db)
         return {"message": "Product deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -521,10 +608,10 @@ def delete_product_image(image_id: int, db: Session = Depends(get_db)):
         if not image:
             raise HTTPException(status_code=404, detail="Product image not found")
         # Optionally, delete the file from the filesystem
-        if os.path.exists(image.images):
-            os.remove(image.images)
+        get_media_storage().delete(image.images)
         db.delete(image)
         db.commit()
+        refresh_catalog(db)
         return {"message": "Product image deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -536,22 +623,24 @@ async def upload_product_images(
     image: UploadFile = File(...),
     product_id: str = Form(...),
     priority: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
         # Save the image
         image_path = os.path.join(setting.PRODUCT_IMG_DIR, image.filename)
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+        await run_in_threadpool(
+            get_media_storage().put_stream, image_path, image.file, image.content_type
+        )
         # Save Metadata to DB
-        create_record(
-            db,
+        await db.run_sync(
+            create_record,
             Product_images,
             images=image_path,
             product_id=product_id,
             status="active",
             priority=priority,
         )
+        await db.run_sync(refresh_catalog)
         return {"message": "Product banner uploaded successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -562,12 +651,17 @@ async def upload_product_images(
 
 @router.get("/products/reviews/list/")
 def list_product_reviews(
-    product_id: Optional[str] = None, db: Session = Depends(get_db)
+    product_id: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    db: Session = Depends(get_db),
 ):
     try:
         query = db.query(Product_rating)
         if product_id is not None and product_id != "null":
             query = query.filter(Product_rating.product_id == product_id)
+        # moderation queue, e.g. ?status=pending
+        if status_filter:
+            query = query.filter(Product_rating.status == status_filter)
         reviews = query.all()
         result = []
         for review in reviews:
@@ -611,11 +705,13 @@ def delete_product_review(review_id: int, db: Session = Depends(get_db)):
             .all()
         )
         for img in images:
-            if os.path.exists(img.images):
-                os.remove(img.images)
+            get_media_storage().delete(img.images)
             db.delete(img)
+        if review.status == COUNTED_STATUS:
+            apply_rating_delta(db, review.product_id, review.rating, -1)
         db.delete(review)
         db.commit()
+        refresh_catalog(db)
         return {"message": "Product review deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -633,6 +729,7 @@ def add_product_review(
 ):
     try:
         # Check if product exists
+        validate_rating(rating)
         product = db.query(Products).filter(Products.id == product_id).first()
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
@@ -640,35 +737,43 @@ def add_product_review(
         for file in files:
             file_path = os.path.join(setting.PRODUCT_REVIEW_DIR, file.filename)
             # Save file to the upload directory
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            get_media_storage().put_stream(file_path, file.file, file.content_type)
             file_paths.append(file_path)
 
-        # Create new review
-        query = create_record(
-            db,
-            Product_rating,
+        # review, summary and images commit together
+        query = Product_rating(
             product_id=product_id,
             user_name=user_name,
             title=title,
             review=review,
             rating=rating,
-            status="approved",
+            status=COUNTED_STATUS,
         )
-
-        # save images in db
-        for img in file_paths:
-            create_record(
-                db,
-                Product_Review_images,
-                product_rating_id=query.id,
-                images=img,
-            )
+        db.add(query)
+        db.flush()
+        apply_rating_delta(db, product_id, rating, 1)
+        db.add_all(
+            Product_Review_images(product_rating_id=query.id, images=img)
+            for img in file_paths
+        )
+        db.commit()
+        refresh_catalog(db)
         return {"message": "Review added successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
+# reconcile rating summaries with the review table
+@router.post("/products/reviews/summary/rebuild/")
+def rebuild_product_rating_summaries(db: Session = Depends(get_db)):
+    try:
+        products = rebuild_rating_summaries(db)
+        refresh_catalog(db)
+        return {"message": "Rating summaries rebuilt successfully", "products": products}
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
 # create list and delete certificate color api
 @router.get("/certificate/color/list/")
 def list_certificate_colors(
@@ -711,6 +816,7 @@ def delete_certificate_color(color_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Certificate color not found")
         db.delete(color)
         db.commit()
+        refresh_catalog(db)
         return {"message": "Certificate color deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -730,6 +836,7 @@ def add_certificate_color(
                 priority=color_data.priority,
                 product_id=color_data.product_id,
             )
+        refresh_catalog(db)
         return {"message": "Certificate colors added successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -773,6 +880,7 @@ def delete_frame_color(color_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Frame color not found")
         db.delete(color)
         db.commit()
+        refresh_catalog(db)
         return {"message": "Frame color deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -791,6 +899,7 @@ def add_frame_color(payload: List[ProductFrameCreate], db: Session = Depends(get
                 priority=data_obj.priority,
                 product_id=data_obj.product_id,
             )
+        refresh_catalog(db)
         return {"message": "Frame color added successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -834,6 +943,7 @@ def delete_frame_size(size_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Frame size not found")
         db.delete(size)
         db.commit()
+        refresh_catalog(db)
         return {"message": "Frame size deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -852,6 +962,7 @@ def add_frame_color(payload: List[ProductFrameCreate], db: Session = Depends(get
                 priority=data_obj.priority,
                 product_id=data_obj.product_id,
             )
+        refresh_catalog(db)
         return {"message": "Frame size added successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -901,6 +1012,7 @@ def delete_frame_thickness(thickness_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Frame thickness not found")
         db.delete(thickness)
         db.commit()
+        refresh_catalog(db)
         return {"message": "Frame thickness deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -919,6 +1031,7 @@ def add_frame_color(payload: List[ProductFrameCreate], db: Session = Depends(get
                 priority=data_obj.priority,
                 product_id=data_obj.product_id,
             )
+        refresh_catalog(db)
         return {"message": "Frame thickness added successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -945,6 +1058,7 @@ def add_product_tag_options(
                     json.dumps(tag_data.tag_optional) if tag_data.tag_optional else None
                 ),
             )
+        refresh_catalog(db)
         return {"message": "Product tags added successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -976,6 +1090,7 @@ def update_product_tag_options(
                 ),
             },
         )
+        refresh_catalog(db)
         return {"message": "Product tag updated successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -983,11 +1098,23 @@ def update_product_tag_options(
 
 # product list api
 @router.get("/product/list/")
-def get_product_list(db: Session = Depends(get_db)):
+def get_product_list(
+    response: Response,
+    sort: str = "priority",
+    cursor: Optional[str] = None,
+    limit: int = setting.PAGE_SIZE_DEFAULT,
+    db: Session = Depends(get_db),
+):
     try:
         result = []
-        products = db.query(Products).all()
-        for product in products:
+        page = keyset_paginate(
+            product_query(db, "detail"),
+            get_product_sort(sort),
+            cursor,
+            clamp_limit(limit, setting.PAGE_SIZE_MAX),
+        )
+        set_page_headers(response, page)
+        for product in page.items:
             product_dict = product.__dict__.copy()
             product_dict.pop(
                 "_sa_instance_state", None
@@ -1046,11 +1173,21 @@ def delete_product_tag(tag_id: int, db: Session = Depends(get_db)):
         db.delete(tag)
         db.commit()
 
+        refresh_catalog(db)
         return {"message": "Tag deleted successfully"}
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
+# order confirmation render times, across processes and for this one
+@router.get("/order/documents/stats/")
+def get_order_documents_stats(db: Session = Depends(get_db)):
+    try:
+        return get_order_document_stats(db)
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
 # order list
 @router.get("/order/list/")
 def get_order_list(db: Session = Depends(get_db)):
@@ -1083,6 +1220,7 @@ def get_order_list(db: Session = Depends(get_db)):
             )
 
             order_data = order.__dict__.copy()
+            order_data["invoice"] = get_invoice_url(order.invoice)
             order_data["shipping_address"] = shipping_address
             order_data["order_details"] = order_details
             order_data["payments"] = payments
@@ -1160,6 +1298,7 @@ def get_order_details(order_id: int, db: Session = Depends(get_db)):
         )
 
         order_data = order.__dict__.copy()
+        order_data["invoice"] = get_invoice_url(order.invoice)
         order_data["shipping_address"] = shipping_address
         order_data["order_details"] = order_details_json
         order_data["payments"] = payments
@@ -1180,14 +1319,14 @@ def update_order_status(
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
 
-        # Add new status entry
-        new_status = create_record(
-            db,
-            Orders_status,
-            user_id=order.user_id,
-            order_id=order_id,
-            order_status=order_status,
+        # Add new status entry, and to the stored order summary
+        new_status = Orders_status(
+            user_id=order.user_id, order_id=order_id, order_status=order_status
         )
+        db.add(new_status)
+        append_order_status(db, order_id, order_status)
+        db.commit()
+        db.refresh(new_status)
         return {
             "message": "Order status updated successfully",
             "order_status_id": new_status.id,
@@ -1209,6 +1348,7 @@ def add_or_update_settings(payload: SettingsSchema, db: Session = Depends(get_db
             settings.shippingCharges = payload.shippingCharges
             db.commit()
             db.refresh(settings)
+            refresh_pricing(db)
             return {"message": "Settings updated successfully"}
         else:
             # Create new settings
@@ -1221,6 +1361,7 @@ def add_or_update_settings(payload: SettingsSchema, db: Session = Depends(get_db
             db.add(new_settings)
             db.commit()
             db.refresh(new_settings)
+            refresh_pricing(db)
             return {"message": "Settings created successfully"}
     except SQLAlchemyError as error:
         raise HTTPException(status_code=400, detail=str(error))
@@ -15,8 +15,53 @@ from app.db.models.orders import (
 )
 from app.db.models.product import *
 from app.db.models.user import SettingsModel, User, User_shipping_address
-from app.schemas.request import AddToCartPayload, OrderCreatePayload
-from app.schemas.response import CartDetailsResponse, ProductResponse, TagOptionResponse
+from app.schemas.request import (
+    AddToCartPayload,
+    BatchAddToCartPayload,
+    OrderCreatePayload,
+)
+from app.schemas.response import (
+    CartDetailsResponse,
+    CartSummaryResponse,
+    ProductResponse,
+    TagOptionResponse,
+)
+from app.services.cashfree_client import (
+    CashfreeClient,
+    PaymentGatewayUnavailable,
+    get_cashfree_client,
+)
+from app.services.cart_service import (
+    add_cart_items,
+    get_session_cart,
+    invalidate_cart,
+)
+from app.services.catalog_service import (
+    filter_products,
+    get_catalog_snapshot,
+    get_product_options,
+    get_product_sort,
+)
+from app.services.home_bundle_service import get_home_bundle, negotiate_encoding
+from app.services.idempotency_service import (
+    IdempotencyConflict,
+    claim_idempotency_key,
+    complete_idempotency_key,
+    release_idempotency_key,
+)
+from app.services.order_service import place_order
+from app.services.order_summary_service import get_order_summary
+from app.services.pricing_service import quote_cart
+from app.services.payment_webhook_service import (
+    InvalidWebhookSignature,
+    notify_webhook_consumer,
+    store_webhook_event,
+    verify_webhook_signature,
+)
+from app.services.rating_service import COUNTED_STATUS, serialize_rating_summary
+from app.services.review_service import get_review_feed
+from app.services.search_service import search_products
+from app.services.similarity_service import get_similar_products
 from app.services.modal_services import (
     create_record,
     get_record_by_filters,
@@ -26,54 +71,85 @@ from fastapi import (
     APIRouter,
     BackgroundTasks,
     Depends,
+    Header,
     HTTPException,
     UploadFile,
     File,
+    Query,
     Request,
+    Response,
 )
 from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import Settings
 from app.core.mail_conf import mail_conf
-from app.db.session import get_db
+from app.db.loading_profiles import product_query
+from app.db.session import get_async_db, get_db
 from fastapi import HTTPException, status
-from sqlalchemy.orm import joinedload, contains_eager
 from sqlalchemy.sql import func
 
 from app.utils.helpers import format_amount, generate_order_id, get_c_gst_s_gst
-from app.utils.task import generate_pdf_and_upload_to_s3, order_email_sent
+from app.utils.http_cache import catalog_not_modified
+from app.utils.pagination import clamp_limit, paginate_sorted, set_page_headers
 from fastapi_mail import FastMail, MessageSchema, MessageType
 from jinja2 import Environment, FileSystemLoader
 
-import httpx
 
 router = APIRouter()
 settings = Settings()
 
-headers = {
-    "x-client-id": "TEST10634350195f39e7a74c17f76fd105343601",
-    "x-client-secret": "cfsk_ma_test_df82f2c52e2886b6946b969b20e32b14_069e556d",
-    "x-api-version": "2022-09-01",  # Required!
-    "Content-Type": "application/json",
-}
-
-
 # 1.banner list api
 # API to Get All Banners
 @router.get("/banners/list/")
-def get_banners(db: Session = Depends(get_db)):
+def get_banners(request: Request, response: Response, db: Session = Depends(get_db)):
     try:
-        banners = db.query(Banners).all()
-        return banners
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "banners")
+        if not_modified:
+            return not_modified
+        return snapshot.banners
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
 @router.get("/category/list/")
-def get_category(db: Session = Depends(get_db)):
+def get_category(request: Request, response: Response, db: Session = Depends(get_db)):
     try:
-        banners = db.query(Category).all()
-        return banners
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "categories")
+        if not_modified:
+            return not_modified
+        return snapshot.categories
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
+# landing page banners, categories and product sections in one request
+@router.get("/bundle/")
+def get_home_page_bundle(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
+    try:
+        snapshot = get_catalog_snapshot(db)
+        bundle = get_home_bundle(snapshot)
+        encoding = negotiate_encoding(
+            request.headers.get("accept-encoding"), bundle.bodies
+        )
+        not_modified = catalog_not_modified(
+            request, response, snapshot, "home_bundle", encoding
+        )
+        if not_modified:
+            return not_modified
+
+        headers = dict(response.headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=bundle.bodies[encoding],
+            media_type="application/json",
+            headers=headers,
+        )
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
@@ -81,68 +157,105 @@ def get_category(db: Session = Depends(get_db)):
 # 2.product list according filter type(best selling product,trending product,search)
 @router.get("/products/list/")
 def get_products(
+    request: Request,
+    response: Response,
     product_type: Optional[str] = "",
     search_name: Optional[str] = "",
     product_category_type: Optional[str] = "",
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = settings.PAGE_SIZE_DEFAULT,
     db: Session = Depends(get_db),
 ):
     try:
-        filters = {"status": True}
-        if product_type:
-            filters["product_type"] = product_type
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "products")
+        if not_modified:
+            return not_modified
 
+        product_ids = None
         if search_name:
-            filters["product_name"] = search_name
+            hits = search_products(db, search_name, limit=settings.SEARCH_RESULT_LIMIT)
+            product_ids = [hit["id"] for hit in hits]
+            if not sort:
+                # relevance order, already bounded by SEARCH_RESULT_LIMIT
+                return filter_products(
+                    snapshot,
+                    product_type=product_type,
+                    product_category=product_category_type,
+                    product_ids=product_ids,
+                )
 
-        if product_category_type:
-            filters["product_category"] = product_category_type
+        sort_key = get_product_sort(sort or "priority")
+        products = filter_products(
+            snapshot,
+            product_type=product_type,
+            product_category=product_category_type,
+            product_ids=product_ids,
+            sort=sort_key.name,
+        )
+        page = paginate_sorted(
+            products, sort_key, cursor, clamp_limit(limit, settings.PAGE_SIZE_MAX)
+        )
+        set_page_headers(response, page)
+        return page.items
 
-        products = get_record_by_filters_all(db=db, model=Products, **filters)
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
-        return products
+
+# product search ranked by relevance, with highlighted matches
+@router.get("/products/search/")
+def search_products_list(
+    request: Request,
+    response: Response,
+    q: str,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+):
+    try:
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "products")
+        if not_modified:
+            return not_modified
+
+        limit = clamp_limit(limit, settings.SEARCH_RESULT_LIMIT)
+        result = []
+        for hit in search_products(db, q, limit=limit):
+            product = snapshot.products_by_id.get(hit["id"])
+            if product is None:
+                continue
+            result.append(
+                {
+                    **product,
+                    "name_highlight": hit["name_highlight"],
+                    "snippet": hit["snippet"],
+                }
+            )
+        return result
 
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
 @router.get("/products/details/")
-def get_products_details(product_id: int, db: Session = Depends(get_db)):
+def get_products_details(
+    request: Request,
+    response: Response,
+    product_id: int,
+    db: Session = Depends(get_db),
+):
     try:
-        # Subquery to get only active product images
-        active_images_subquery = (
-            db.query(Product_images)
-            .filter(Product_images.status == "approved")
-            .subquery()
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(
+            request, response, snapshot, "product_details"
         )
+        if not_modified:
+            return not_modified
 
-        # Query to fetch product details with active images and ratings
-        query = (
-            db.query(Products)
-            .outerjoin(
-                active_images_subquery,
-                Products.id == active_images_subquery.c.product_id,
-            )  # Join only active images
-            .outerjoin(
-                Product_rating, Products.id == Product_rating.product_id
-            )  # Join ratings
-            .outerjoin(Certificate_colors, Products.id == Certificate_colors.product_id)
-            .outerjoin(Frame_colors, Products.id == Frame_colors.product_id)
-            .outerjoin(Frame_size, Products.id == Frame_size.product_id)
-            .outerjoin(Frame_Thickness, Products.id == Frame_Thickness.product_id)
-            .outerjoin(
-                Product_tag_options, Products.id == Product_tag_options.product_id
-            )
-            .filter(Products.id == product_id)
-            .options(
-                joinedload(Products.product_ratings),
-                joinedload(Products.certificate_colors),
-                joinedload(Products.frame_colors),
-                joinedload(Products.frame_size),
-                joinedload(Products.frame_thickness),
-                joinedload(Products.product_tag_options),
-            )
-            .first()
-        )
+        query = product_query(db, "detail").filter(Products.id == product_id).first()
+        if not query:
+            raise HTTPException(status_code=404, detail="Product not found")
 
         # Deserialize tag_optional for each product_tag_option
         for tag_option in query.product_tag_options:
@@ -152,65 +265,30 @@ def get_products_details(product_id: int, db: Session = Depends(get_db)):
                 except json.JSONDecodeError:
                     tag_option.tag_optional = {}
 
-        # Add similar products by product_category_type
-        similar_products = []
-        if query and query.product_category:
-            similar_products = (
-                db.query(Products)
-                .filter(
-                    Products.product_category == query.product_category,
-                    Products.id != product_id,
-                    Products.status == True,
-                )
-                .limit(8)
-                .all()
-            )
-
-        # Add product reviews
-        product_reviews = (
-            db.query(
-                Product_rating.id,
-                Product_rating.user_name,
-                Product_rating.title,
-                Product_rating.review,
-                Product_rating.rating,
-                Product_rating.created_at,
-                func.group_concat(Product_Review_images.images).label("review_images"),
-            )
-            .outerjoin(
-                Product_Review_images,
-                Product_rating.id == Product_Review_images.product_rating_id,
-            )
-            .filter(Product_rating.product_id == product_id)
-            .group_by(Product_rating.id)
-            .all()
-        )
+        # Ranked similar products from the precomputed index
+        similar_products = get_similar_products(db, product_id)
 
-        print("product_reviews", product_reviews)
-        formatted_reviews = [
-            {
-                "id": row.id,
-                "user_name": row.user_name,
-                "title": row.title,
-                "review": row.review,
-                "rating": row.rating,
-                "created_at": (
-                    row.created_at.strftime("%b %d, %Y") if row.created_at else None
-                ),
-                "review_images": (
-                    row.review_images.split(",") if row.review_images else []
-                ),
-            }
-            for row in product_reviews
-        ]
+        # Add product reviews (first page of the review feed)
+        formatted_reviews = get_review_feed(
+            db, product_id=product_id, limit=settings.PAGE_SIZE_DEFAULT
+        ).items
 
         # Attach similar_products and reviews to the response object
         # If ProductResponse supports extra fields, otherwise add as dict
         product_dict = query.__dict__.copy()
+        product_dict.pop("_sa_instance_state", None)
 
-        if query:
-            product_dict["similar_products"] = similar_products
-            product_dict["product_reviews"] = formatted_reviews
+        product_dict["similar_products"] = similar_products
+        product_dict["product_reviews"] = formatted_reviews
+        cached_product = snapshot.products_by_id.get(product_id)
+        if cached_product:
+            product_dict["rating_summary"] = cached_product["rating_summary"]
+        else:
+            product_dict["rating_summary"] = serialize_rating_summary(
+                db.query(Product_rating_summary)
+                .filter(Product_rating_summary.product_id == product_id)
+                .first()
+            )
 
         return product_dict
     except Exception as error:
@@ -219,108 +297,82 @@ def get_products_details(product_id: int, db: Session = Depends(get_db)):
 
 # 3.Customer reviews api
 @router.get("/products/reviews/")
-def get_product_review_by_product_id(product_id: int, db: Session = Depends(get_db)):
+def get_product_review_by_product_id(
+    request: Request,
+    response: Response,
+    product_id: int,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    limit: int = settings.PAGE_SIZE_DEFAULT,
+    db: Session = Depends(get_db),
+):
     try:
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "reviews")
+        if not_modified:
+            return not_modified
+
         # Check if product exists
-        product = db.query(Products).filter(Products.id == product_id).first()
+        product = product_query(db).filter(Products.id == product_id).first()
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
-        # Fetch product reviews
-        product_reviews = (
-            db.query(
-                Product_rating.id,
-                Product_rating.user_name,
-                Product_rating.title,
-                Product_rating.review,
-                Product_rating.rating,
-                Product_rating.created_at,
-                func.group_concat(Product_Review_images.images).label(
-                    "review_images"
-                ),  # Group images
-            )
-            .outerjoin(
-                Product_Review_images,
-                Product_rating.id == Product_Review_images.product_rating_id,
-            )
-            .filter(Product_rating.product_id == product_id)
-            .group_by(Product_rating.id)
-            .all()
-        )  # Fetch all matching results
-
-        # Convert query result into a list of dictionaries
-        formatted_reviews = [
-            {
-                "id": row.id,
-                "user_name": row.user_name,
-                "title": row.title,
-                "review": row.review,
-                "rating": row.rating,
-                "created_at": (
-                    row.created_at.strftime("%b %d, %Y") if row.created_at else None
-                ),
-                "review_images": (
-                    row.review_images.split(",") if row.review_images else []
-                ),  # Convert CSV to list
-            }
-            for row in product_reviews
-        ]
-
-        return formatted_reviews
+        page = get_review_feed(
+            db,
+            product_id=product_id,
+            # only approved reviews are public
+            status=COUNTED_STATUS,
+            sort=sort,
+            cursor=cursor,
+            limit=clamp_limit(limit, settings.PAGE_SIZE_MAX),
+        )
+        set_page_headers(response, page)
+        return page.items
 
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
+# review feed across all products (home page testimonials)
 @router.get("/products/reviews/all/")
-def get_product_review_by_product_all(db: Session = Depends(get_db)):
+def get_product_review_by_product_all(
+    request: Request,
+    response: Response,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    limit: int = settings.PAGE_SIZE_DEFAULT,
+    db: Session = Depends(get_db),
+):
     try:
-        # Check if product exists
-        query = (
-            db.query(
-                Product_rating.id,
-                Product_rating.user_name,
-                Product_rating.title,
-                Product_rating.review,
-                Product_rating.rating,
-                Product_rating.created_at,
-                func.group_concat(Product_Review_images.images).label(
-                    "review_images"
-                ),  # Group all images
-            )
-            .outerjoin(
-                Product_Review_images,
-                Product_rating.id == Product_Review_images.product_rating_id,
-            )  # Outer join to include ratings without images
-            .group_by(Product_rating.id)  # Group by product rating ID
-            .all()
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "reviews")
+        if not_modified:
+            return not_modified
+
+        page = get_review_feed(
+            db,
+            # only approved reviews are public
+            status=COUNTED_STATUS,
+            sort=sort,
+            cursor=cursor,
+            limit=clamp_limit(limit, settings.PAGE_SIZE_MAX),
         )
-        # Convert query result into a list of dictionaries
-        formatted_ratings = [
-            {
-                "id": row.id,
-                "rating": row.rating,
-                "user_name": row.user_name,
-                "title": row.title,
-                "review": row.review,
-                "created_at": (
-                    row.created_at.strftime("%b %d, %Y") if row.created_at else None
-                ),
-                "review_images": (
-                    row.review_images.split(",") if row.review_images else []
-                ),  # Convert CSV to list
-            }
-            for row in query
-        ]
-        return formatted_ratings
-        # Create new review
+        set_page_headers(response, page)
+        return page.items
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
 @router.get("/products/certificate/color/list")
-def get_product_certificate_color_list(db: Session = Depends(get_db)):
+def get_product_certificate_color_list(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
     try:
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "options")
+        if not_modified:
+            return not_modified
+
         instance = get_record_by_filters_all(db=db, model=Certificate_colors)
         return instance
     except Exception as error:
@@ -328,8 +380,15 @@ def get_product_certificate_color_list(db: Session = Depends(get_db)):
 
 
 @router.get("/products/frame/color/list")
-def get_product_frame_color_list(db: Session = Depends(get_db)):
+def get_product_frame_color_list(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
     try:
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "options")
+        if not_modified:
+            return not_modified
+
         instance = get_record_by_filters_all(db=db, model=Frame_colors)
         return instance
     except Exception as error:
@@ -337,8 +396,15 @@ def get_product_frame_color_list(db: Session = Depends(get_db)):
 
 
 @router.get("/products/frame/size/list")
-def get_product_frame_size_list(db: Session = Depends(get_db)):
+def get_product_frame_size_list(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
     try:
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "options")
+        if not_modified:
+            return not_modified
+
         instance = get_record_by_filters_all(db=db, model=Frame_size)
         return instance
     except Exception as error:
@@ -346,14 +412,43 @@ def get_product_frame_size_list(db: Session = Depends(get_db)):
 
 
 @router.get("/products/frame/thickness/list")
-def get_product_frame_thickness_list(db: Session = Depends(get_db)):
+def get_product_frame_thickness_list(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
     try:
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "options")
+        if not_modified:
+            return not_modified
+
         instance = get_record_by_filters_all(db=db, model=Frame_Thickness)
         return instance
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
+# active options of one or more products, grouped by option table
+@router.get("/products/options/")
+def get_product_option_matrix(
+    request: Request,
+    response: Response,
+    product_ids: List[int] = Query(..., alias="product_id"),
+    db: Session = Depends(get_db),
+):
+    try:
+        if len(product_ids) > settings.PAGE_SIZE_MAX:
+            raise ValueError(
+                f"At most {settings.PAGE_SIZE_MAX} product ids per request"
+            )
+        snapshot = get_catalog_snapshot(db)
+        not_modified = catalog_not_modified(request, response, snapshot, "options")
+        if not_modified:
+            return not_modified
+        return get_product_options(snapshot, product_ids)
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
 @router.post("/product/add_to_cart/")
 def product_add_to_cart(payload: AddToCartPayload, db: Session = Depends(get_db)):
     try:
@@ -380,37 +475,47 @@ def product_add_to_cart(payload: AddToCartPayload, db: Session = Depends(get_db)
                         tag_data=objs["data"],
                     )
 
+        invalidate_cart(payload.session_id)
         return {"message": "Product  added in cart successfully"}
 
     except Exception as error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
+# several cart lines with their tag selections in one transaction
+@router.post("/product/add_to_cart/batch/", response_model=CartSummaryResponse)
+def product_add_to_cart_batch(
+    payload: BatchAddToCartPayload, db: Session = Depends(get_db)
+):
+    try:
+        items = add_cart_items(db, payload.session_id, payload.items)
+        return {
+            "session_id": payload.session_id,
+            "item_count": len(items),
+            "items": items,
+        }
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
+# server-side price, shipping and GST for the session's cart
+@router.get("/cart/quote/{session_id}")
+def get_cart_quote(session_id: str, db: Session = Depends(get_db)):
+    try:
+        return quote_cart(db, session_id)
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
 # --- GET API ---
 @router.get(
     "/product/cart_details/{session_id}", response_model=List[CartDetailsResponse]
 )
 def get_cart_details(session_id: str, db: Session = Depends(get_db)):
     try:
-        carts = db.query(Carts).filter(Carts.session_id == session_id).all()
-        if not carts:
+        result = get_session_cart(db, session_id)
+        if not result:
             raise ValueError("No cart items found for this session")
-        result = []
-        for cart in carts:
-            product = (
-                db.query(Products).filter(Products.id == cart.product_id).first()
-            )  # Assuming Carts has relationship: `product = relationship("Products")`
-            result.append(
-                CartDetailsResponse(
-                    cart_id=cart.id,
-                    product_id=cart.product_id,
-                    product_name=product.product_name,
-                    price=product.price,
-                    is_digital=product.is_digital,
-                    thumbnail=product.thumbnail,
-                )
-            )
-
         return result
 
     except Exception as e:
@@ -430,9 +535,11 @@ def delete_cart_item(cart_id: int, db: Session = Depends(get_db)):
             order_selected_tags.cart_id == cart_id
         ).delete()
 
+        session_id = cart_item.session_id
         # Delete cart item
         db.delete(cart_item)
         db.commit()
+        invalidate_cart(session_id)
 
         return {"message": "Cart item deleted successfully"}
 
@@ -473,110 +580,38 @@ def get_cart_details(
     order_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
 ):
     try:
-        orders = db.query(Orders).filter(Orders.txn_id == order_id).first()
-        if not orders:
+        order_obj = get_order_summary(db, order_id)
+        if order_obj is None:
             raise ValueError("Order details not found")
-
-        # Get user
-        user = db.query(User).filter(User.id == orders.user_id).first()
-
-        # Get shipping address
-        shipping_address = (
-            db.query(User_shipping_address)
-            .filter(User_shipping_address.id == orders.shipping_address)
-            .first()
-        )
-
-        # Get order product details
-        order_details = (
-            db.query(Order_details).filter(Order_details.order_id == orders.id).all()
-        )
-
-        product_details = []
-        for order_det_obj in order_details:
-            product = (
-                db.query(Products)
-                .filter(Products.id == order_det_obj.product_id)
-                .first()
-            )
-            product_details.append(
-                {
-                    "product_id": product.id,
-                    "product_name": product.product_name,
-                    "price": format_amount(product.price),
-                    "is_digital": product.is_digital,
-                    "thumbnail": product.thumbnail,
-                    "thumbnail_url": settings.IMAGE_URL + product.thumbnail,
-                    "certificate_color": order_det_obj.certificate_color,
-                    "frame_color": order_det_obj.frame_color,
-                }
-            )
-
-        # Get order status history
-        order_status = (
-            db.query(Orders_status).filter(Orders_status.order_id == orders.id).all()
-        )
-        order_status_list = []
-        for status_obj in order_status:
-            order_status_list.append(
-                {
-                    "title": status_obj.order_status,
-                    "description": status_obj.created_at.strftime("%d/%m/%Y"),
-                }
-            )
-
-        # ✅ Build final order object
-        order_obj = {
-            "txn_id": orders.txn_id,
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "phone": user.phone,
-            },
-            "shipping_address": {
-                "user_email": shipping_address.user_email,
-                "full_name": shipping_address.user_fname
-                + " "
-                + shipping_address.user_lname,
-                "user_fname": shipping_address.user_fname,
-                "user_lname": shipping_address.user_lname,
-                "user_address": shipping_address.user_address,
-                "city": shipping_address.city,
-                "state": shipping_address.state,
-                "pincode": shipping_address.pincode,
-                "country": shipping_address.country,
-                "contact_mobile": shipping_address.contact_mobile,
-            },
-            "products": product_details,
-            "order_status": order_status_list,
-            "total_amount": format_amount(orders.total_amount),
-            "amount": format_amount(
-                int(orders.total_amount) - int(orders.shipping_fee)
-            ),
-            "shipping_fee": format_amount(orders.shipping_fee),
-            "subtotal": format_amount(orders.sub_total),
-            "c_gst": format_amount(orders.c_gst),
-            "s_gst": format_amount(orders.s_gst),
-            "paid_amount": format_amount(orders.paid_amount),
-            "invoice_url": orders.invoice,
-            # "order_status_current": orders.order_status,
-        }
         return order_obj  # return in list to match response_model
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-CASHFREE_API_BASE = "https://sandbox.cashfree.com/pg/orders"  # Use sandbox for testing
-
-
 @router.post("/product/create-order/")
-async def create_order(request: Request):
+async def create_order(
+    request: Request,
+    gateway: CashfreeClient = Depends(get_cashfree_client),
+    db: AsyncSession = Depends(get_async_db),
+):
     data = await request.json()
 
+    amount = data["amount"]
+    if data.get("session_id"):
+        # charge the server-side quote, not the client's figure, priced from
+        # the database rather than this process's cart cache
+        try:
+            quote = await db.run_sync(quote_cart, data["session_id"], fresh=True)
+        except Exception as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+        amount = quote["total_amount"]
+
     payload = {
         "order_id": data["order_id"],
-        "order_amount": data["amount"],
+        "order_amount": amount,
         "order_currency": "INR",
         "customer_details": {
             "customer_id": data["customer_id"],
@@ -585,34 +620,100 @@ async def create_order(request: Request):
         },
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(CASHFREE_API_BASE, headers=headers, json=payload)
-        return JSONResponse(status_code=response.status_code, content=response.json())
+    try:
+        response = await gateway.create_order(payload)
+    except PaymentGatewayUnavailable as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error)
+        )
+    return JSONResponse(status_code=response.status_code, content=response.json())
 
 
 @router.get("/product/verify-order/{order_id}")
-async def verify_order(order_id: str):
-    url = f"https://sandbox.cashfree.com/pg/orders/{order_id}"
+async def verify_order(
+    order_id: str, gateway: CashfreeClient = Depends(get_cashfree_client)
+):
+    try:
+        response = await gateway.get_order(order_id)
+    except PaymentGatewayUnavailable as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error)
+        )
+    return response.json()
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
 
-    return response.json()
+# Cashfree payment webhooks: verified, stored and acknowledged; the lifespan
+# consumer applies them to Payment_details and Orders_status
+@router.post("/payment/webhook/")
+async def cashfree_webhook(
+    request: Request, db: AsyncSession = Depends(get_async_db)
+):
+    raw_body = await request.body()
+    try:
+        verify_webhook_signature(
+            raw_body,
+            request.headers.get("x-webhook-timestamp", ""),
+            request.headers.get("x-webhook-signature", ""),
+        )
+        await db.run_sync(store_webhook_event, raw_body)
+    except InvalidWebhookSignature as error:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(error))
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    notify_webhook_consumer()
+    return {"message": "Webhook received"}
+
+
+# payment and order state as last reported by webhooks, without calling Cashfree
+@router.get("/product/payment-status/{order_id}")
+def get_payment_status(order_id: str, db: Session = Depends(get_db)):
+    try:
+        order = db.query(Orders).filter(Orders.txn_id == order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        payment = (
+            db.query(Payment_details)
+            .filter(Payment_details.order_id == order.id)
+            .order_by(Payment_details.updated_at.desc(), Payment_details.id.desc())
+            .first()
+        )
+        order_status = (
+            db.query(Orders_status)
+            .filter(Orders_status.order_id == order.id)
+            .order_by(Orders_status.id.desc())
+            .first()
+        )
+        return {
+            "order_id": order_id,
+            "payment_status": payment.payment_status if payment else None,
+            "order_status": order_status.order_status if order_status else None,
+        }
+    except Exception as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
 @router.post("/product/verify/order/")
 async def create_product_order(
     session_id: str,
     order_id: str,
-    background_tasks: BackgroundTasks,
     payload: OrderCreatePayload,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    gateway: CashfreeClient = Depends(get_cashfree_client),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
+    # retries of the same checkout replay the first response
+    request_key = f"verify-order:{idempotency_key or order_id}"
     try:
-        url = f"https://sandbox.cashfree.com/pg/orders/{order_id}/payments"
+        stored = await db.run_sync(claim_idempotency_key, request_key)
+    except IdempotencyConflict as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+    if stored is not None:
+        return JSONResponse(
+            status_code=stored.response_status, content=stored.response_body
+        )
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
+    try:
+        response = await gateway.get_order_payments(order_id)
 
         payment = response.json()
         # print("payment",payment)
@@ -633,216 +734,26 @@ async def create_product_order(
         # verify payments
         if payment is None:
             raise ValueError("Payment not found")
-        # # 1. Get or create user
-        user = db.query(User).filter(User.phone == payload.phone).first()
-        if not user:
-            user = User(
-                username=payload.username,
-                phone=payload.phone,
-                email=payload.email,
-                password=payload.phone,
-                status="active",
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-
-        # 2. Create user shipping address
-        shipping = User_shipping_address(
-            user_email=payload.user_email,
-            user_fname=payload.user_fname,
-            user_lname=payload.user_lname,
-            user_address=payload.user_address,
-            city=payload.city,
-            landmark=payload.landmark,
-            state=payload.state,
-            pincode=payload.pincode,
-            country=payload.country,
-            contact_mobile=payload.contact_mobile,
-            user_id=user.id,
-        )
-        db.add(shipping)
-        db.commit()
-        db.refresh(shipping)
-
-        # 3. Create main order
-        settings_details = db.query(SettingsModel).first()
-
-        amount_with_shipping = int(payload.total_amount) - int(payload.shipping_fee)
-        gst = get_c_gst_s_gst(amount_with_shipping, settings_details)
-        order = Orders(
-            user_id=user.id,
-            total_amount=payload.total_amount,
-            shipping_fee=payload.shipping_fee,
-            shipping_address=shipping.id,
-            sub_total=gst["subtotal"],
-            c_gst=gst["cgst"],
-            s_gst=gst["sgst"],
-            paid_amount=payload.total_amount,
-            txn_id=payment_detail["order_id"],
-        )
-        db.add(order)
-        db.commit()
-        db.refresh(order)
-
-        # 4. Fetch cart items
-        carts = db.query(Carts).filter(Carts.session_id == session_id).all()
-        if not carts:
-            raise HTTPException(
-                status_code=404, detail="No cart items found for session"
-            )
-
-        # 5. Add order details and assign tags
-        for product in carts:
-            order_detail = Order_details(
-                user_id=user.id,
-                product_id=product.product_id,
-                order_id=order.id,
-                quantity=1,
-                certificate_color=(
-                    product.certificate_color
-                    if product.certificate_color is not None
-                    else ""
-                ),
-                frame_color=(
-                    product.frame_color if product.frame_color is not None else ""
-                ),
-                frame_size=product.frame_size if product.frame_size is not None else "",
-                frame_thickness=(
-                    product.frame_thickness
-                    if product.frame_thickness is not None
-                    else ""
-                ),
-            )
-            db.add(order_detail)
-            db.commit()
-            db.refresh(order_detail)
-
-            # Move associated tags from cart to order
-            tag_list = (
-                db.query(order_selected_tags)
-                .filter(order_selected_tags.cart_id == product.id)
-                .all()
-            )
-
-            for tag in tag_list:
-                tag.cart_id = None
-                tag.order_id = order.id
-                db.commit()
-                db.refresh(tag)
-
-        # payment record
-        payment_obj = Payment_details(
-            order_id=order.id,
-            user_id=user.id,
-            payment_id=payment_detail["cf_payment_id"],
-            payment_amount=payment_detail["payment_amount"],
-            payment_status=payment_detail["payment_status"],
-            payment_response=payment_detail,
-        )
-
-        db.add(payment_obj)
-        db.commit()
-        db.refresh(payment_obj)
-        # order status update
-        create_record(
-            db,
-            Orders_status,
-            order_status="Processing",
-            order_id=order.id,
-            user_id=user.id,
-        )
-
-        # ✅ Delete cart item
-        db.query(Carts).filter(Carts.session_id == session_id).delete()
-        # db.delete(product)
-        db.commit()
-        # create order in Razorpay
-
-        # Get order product details
-        order_details = (
-            db.query(Order_details).filter(Order_details.order_id == order.id).all()
-        )
-
-        product_details = []
-        for order_det_obj in order_details:
-            product = (
-                db.query(Products)
-                .filter(Products.id == order_det_obj.product_id)
-                .first()
-            )
-            product_details.append(
-                {
-                    "product_id": product.id,
-                    "product_name": product.product_name,
-                    "price": format_amount(product.price),
-                    "is_digital": product.is_digital,
-                    "thumbnail": product.thumbnail,
-                    "thumbnail_url": settings.IMAGE_URL + product.thumbnail,
-                    "certificate_color": order_det_obj.certificate_color,
-                    "frame_color": order_det_obj.frame_color,
-                }
-            )
-
-        # ✅ Build final order object
-        payment_method = payment_detail.get("payment_method", {})
-
-        # Get the method type: 'card', 'upi', 'netbanking', etc.
-        method_type = next(iter(payment_method), None)
-
-        order_obj = {
-            "txn_id": order.txn_id,
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "phone": user.phone,
-            },
-            "shipping_address": {
-                "user_email": shipping.user_email,
-                "full_name": shipping.user_fname + " " + shipping.user_lname,
-                "user_fname": shipping.user_fname,
-                "user_lname": shipping.user_lname,
-                "user_address": shipping.user_address,
-                "city": shipping.city,
-                "state": shipping.state,
-                "pincode": shipping.pincode,
-                "country": shipping.country,
-                "contact_mobile": shipping.contact_mobile,
-            },
-            "products": product_details,
-            "total_amount": format_amount(order.total_amount),
-            "amount": format_amount(int(order.total_amount) - int(order.shipping_fee)),
-            "shipping_fee": format_amount(order.shipping_fee),
-            "paid_amount": format_amount(order.paid_amount),
-            "subtotal": format_amount(order.sub_total),
-            "c_gst": format_amount(order.c_gst),
-            "s_gst": format_amount(order.s_gst),
-            "cgst_rate": gst["cgst_rate"],
-            "sgst_rate": gst["sgst_rate"],
-            "WEB_URL": settings.WEB_URL + order.txn_id,
-            "payment_methods": method_type,
-        }
-
-        background_tasks.add_task(
-            order_email_sent, email_to=payload.email, data=order_obj
-        )
-
-        # generate_pdf_and_upload_to_s3
-        background_tasks.add_task(
-            generate_pdf_and_upload_to_s3,
-            db=db,
-            file_name="order_invoice",
-            data=order_obj,
-            order_id=order.txn_id,
-        )
-
-        return {
+        await db.run_sync(place_order, session_id, payload, payment_detail)
+        invalidate_cart(session_id)
+        # email, invoice and similar products were queued with the order;
+        # `python -m app.worker` runs them
+        result = {
             "message": "Payment created successfully",
             "order_id": order_id,
         }
+        await db.run_sync(
+            complete_idempotency_key, request_key, status.HTTP_200_OK, result
+        )
+        return result
 
+    except PaymentGatewayUnavailable as error:
+        await db.run_sync(release_idempotency_key, request_key)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error)
+        )
     except Exception as error:
-        db.rollback()
+        await db.run_sync(release_idempotency_key, request_key)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Order creation failed: {str(error)}",
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import Settings
 from app.core import security
@@ -7,12 +8,12 @@ from app.db.models.user import User, UserStatus
 from app.schemas.request import UserCreate, UserResponse, UserUpdate
 from app.schemas.response import B2BLoginResponse, TokenResponse
 from app.services.user_service import (
-    admin_user_login,
+    admin_user_login_async,
     get_user_by_id,
     create_user,
     update_user,
 )
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from fastapi import HTTPException, status
 
 
@@ -37,8 +38,10 @@ def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)):
 
 # login user B2B
 @router.post("/admin/login/")
-async def login(data: B2BLoginResponse, db: Session = Depends(get_db)):
-    user = admin_user_login(session=db, email=data.email, password=data.password)
+async def login(data: B2BLoginResponse, db: AsyncSession = Depends(get_async_db)):
+    user = await admin_user_login_async(
+        session=db, email=data.email, password=data.password
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1,7 +1,8 @@
 import os
+import tempfile
 from pathlib import Path
 import warnings
-from typing import Annotated, Any, Literal
+from typing import Annotated, Any, Literal, Optional
 from dotenv import load_dotenv
 
 from pydantic import (
@@ -67,6 +68,90 @@ class Settings(BaseSettings):
 
     PRODUCT_IMG_DIR: str = "images/products/banners"
     PRODUCT_REVIEW_DIR: str = "images/reviews"
+    SEARCH_RESULT_LIMIT: int = 50
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
+    # how often a process compares its catalog snapshot with the database, so
+    # admin writes handled by another worker process reach it
+    CATALOG_FRESHNESS_CHECK_SECONDS: float = 2.0
+    # Cache-Control per storefront read route, overridable as JSON in the env
+    CACHE_CONTROL_POLICIES: dict[str, str] = {
+        "banners": "public, max-age=300, stale-while-revalidate=3600",
+        "categories": "public, max-age=300, stale-while-revalidate=3600",
+        "products": "public, max-age=60, stale-while-revalidate=600",
+        "product_details": "public, max-age=60, stale-while-revalidate=600",
+        "reviews": "public, max-age=60, stale-while-revalidate=600",
+        "options": "public, max-age=300, stale-while-revalidate=3600",
+        "home_bundle": "public, max-age=60, stale-while-revalidate=600",
+    }
+    # product_type sections of /home/bundle/, overridable as JSON in the env
+    HOME_BUNDLE_PRODUCT_TYPES: list[str] = ["best_selling", "trending"]
+    HOME_BUNDLE_SECTION_LIMIT: int = 12
+    CART_CACHE_TTL_SECONDS: int = 300
+    CART_CACHE_MAX_SESSIONS: int = 10000
+    CART_BATCH_MAX_ITEMS: int = 50
+    # sessions whose newest cart line is older than this are swept
+    CART_TTL_HOURS: int = 24 * 7
+    CART_SWEEP_INTERVAL_MINUTES: int = 60
+    CART_SWEEP_BATCH_SIZE: int = 500
+
+    # cashfree payment gateway
+    CASHFREE_BASE_URL: str = "https://sandbox.cashfree.com/pg"
+    CASHFREE_CLIENT_ID: str = "TEST10634350195f39e7a74c17f76fd105343601"
+    CASHFREE_CLIENT_SECRET: str = "cfsk_ma_test_df82f2c52e2886b6946b969b20e32b14_069e556d"
+    CASHFREE_API_VERSION: str = "2022-09-01"
+    CASHFREE_CONNECT_TIMEOUT: float = 3.0
+    CASHFREE_READ_TIMEOUT: float = 10.0
+    CASHFREE_MAX_CONNECTIONS: int = 20
+    CASHFREE_MAX_RETRIES: int = 3
+    CASHFREE_BACKOFF_BASE: float = 0.2
+    CASHFREE_BREAKER_FAILURES: int = 5
+    CASHFREE_BREAKER_RESET_SECONDS: float = 30.0
+    # serve payment calls from app.services.cashfree_fake (offline load tests)
+    CASHFREE_FAKE: bool = False
+    CASHFREE_FAKE_LATENCY_MS: int = 0
+    CASHFREE_WEBHOOK_TOLERANCE_SECONDS: int = 300
+    CASHFREE_WEBHOOK_POLL_SECONDS: float = 5.0
+    CASHFREE_WEBHOOK_MAX_ATTEMPTS: int = 10
+    # a claimed event is due again if its consumer has not finished by then
+    CASHFREE_WEBHOOK_LEASE_SECONDS: int = 60
+    # stored responses of idempotent requests
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    # an in-flight key older than this is treated as abandoned
+    IDEMPOTENCY_LOCK_SECONDS: int = 120
+
+    # background job queue, drained by `python -m app.worker`. JOB_WORKER_IN_WEB
+    # lets every web process drain it too, for local development only: the
+    # jobs then take threadpool slots from the requests
+    JOB_WORKER_IN_WEB: bool = False
+    JOB_WORKER_CONCURRENCY: int = 4
+    # how long web shutdown waits for the jobs in hand before abandoning them
+    # to lease expiry
+    JOB_SHUTDOWN_GRACE_SECONDS: float = 30.0
+    JOB_POLL_SECONDS: float = 1.0
+    # a running job whose lease is older than this is handed to another worker
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_BACKOFF_BASE_SECONDS: float = 10.0
+    JOB_BACKOFF_MAX_SECONDS: float = 3600.0
+
+    # wkhtmltopdf process pool, see invoice_service
+    INVOICE_RENDER_WORKERS: int = 2
+    INVOICE_RENDER_QUEUE_DEPTH: int = 16
+    INVOICE_RENDER_TIMEOUT_SECONDS: float = 60.0
+    # compiled Jinja bytecode, shared by web and worker processes
+    TEMPLATE_CACHE_DIR: str = os.path.join(tempfile.gettempdir(), "joyful-templates")
+
+    # pooled SMTP delivery, see mail_service
+    MAIL_POOL_SIZE: int = 2
+    MAIL_BATCH_SIZE: int = 20
+    MAIL_MESSAGES_PER_CONNECTION: int = 50
+    MAIL_MAX_RETRIES: int = 3
+    MAIL_RETRY_BACKOFF_SECONDS: float = 1.0
+    MAIL_QUEUE_SIZE: int = 1000
+    MAIL_TIMEOUT_SECONDS: float = 30.0
+    # "host:port" of a local SMTP stand-in used instead of office365
+    MAIL_STAND_IN: Optional[str] = None
     # os.path.join(os.getcwd(), "templates")
 
     os.makedirs(BANNER_DIR, exist_ok=True)
@@ -76,12 +161,25 @@ class Settings(BaseSettings):
     os.makedirs(PRODUCT_REVIEW_DIR, exist_ok=True)
     os.makedirs(CATEGORY_DIR, exist_ok=True)
 
-    # aws
-    AWS_ACCESS_KEY: str = Field(..., env="AWS_ACCESS_KEY")
-    AWS_SECRET_KEY: str = Field(..., env="AWS_SECRET_KEY")
-    AWS_REGION: str = Field(..., env="AWS_REGION")
-
-    S3_BUCKET_NAME: str = Field(..., env="S3_BUCKET_NAME")
+    # aws, only needed when a storage backend below is "s3"
+    AWS_ACCESS_KEY: Optional[str] = Field(None, env="AWS_ACCESS_KEY")
+    AWS_SECRET_KEY: Optional[str] = Field(None, env="AWS_SECRET_KEY")
+    AWS_REGION: Optional[str] = Field(None, env="AWS_REGION")
+
+    S3_BUCKET_NAME: Optional[str] = Field(None, env="S3_BUCKET_NAME")
+    S3_PUBLIC_URLS: bool = True  # False serves presigned URLs instead
+    S3_PRESIGNED_URL_SECONDS: int = 3600
+    S3_MAX_POOL_CONNECTIONS: int = 20
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+    S3_MULTIPART_CHUNK_MB: int = 8
+    S3_MAX_CONCURRENCY: int = 4
+
+    # object storage, see storage_service; "local" or "s3". Local files are
+    # served at IMAGE_URL + key.
+    MEDIA_STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    MEDIA_STORAGE_ROOT: str = "."
+    INVOICE_STORAGE_BACKEND: Literal["local", "s3"] = "s3"
+    INVOICE_STORAGE_ROOT: str = "."
 
     @computed_field  # type: ignore[misc]
     @property
@@ -90,6 +188,13 @@ class Settings(BaseSettings):
         db_path = Path(self.SQLITE_DB_FILE).resolve()
         return f"sqlite:///{db_path}"
 
+    @computed_field  # type: ignore[misc]
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> str:
+        """Same database through aiosqlite, for async route handlers"""
+        db_path = Path(self.SQLITE_DB_FILE).resolve()
+        return f"sqlite+aiosqlite:///{db_path}"
+
     def _check_default_secret(self, var_name: str, value: str) -> None:
         if value == "changethis":
             message = (
@@ -0,0 +1,37 @@
+from sqlalchemy.orm import Query, Session, noload, selectinload
+
+from app.db.models.product import Product_rating, Products
+
+
+# Named relationship loading profiles for Products. Every profile issues one
+# query for the products plus at most one SELECT ... IN per child table, so
+# the row count never multiplies across relationships.
+PRODUCT_LOADING_PROFILES = {
+    # list views only serialize product columns
+    "list": [noload("*")],
+    # storefront product page
+    "detail": [
+        selectinload(Products.product_images),
+        selectinload(Products.product_ratings).selectinload(
+            Product_rating.product_review_images
+        ),
+        selectinload(Products.product_tag_options),
+        selectinload(Products.certificate_colors),
+        selectinload(Products.frame_colors),
+        selectinload(Products.frame_size),
+        selectinload(Products.frame_thickness),
+    ],
+    # admin product page (media and reviews only)
+    "admin": [
+        selectinload(Products.product_images),
+        selectinload(Products.product_ratings).selectinload(
+            Product_rating.product_review_images
+        ),
+    ],
+}
+
+
+def product_query(db: Session, profile: str = "list") -> Query:
+    if profile not in PRODUCT_LOADING_PROFILES:
+        raise ValueError(f"Unknown product loading profile: {profile}")
+    return db.query(Products).options(*PRODUCT_LOADING_PROFILES[profile])
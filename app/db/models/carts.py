@@ -1,6 +1,7 @@
 from datetime import datetime
 from enum import IntEnum
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 class ItemBase(SQLModel):
@@ -10,9 +11,21 @@ class ItemBase(SQLModel):
 
 class Carts(ItemBase, table=True):  # Use table=True to indicate this is a table
     __tablename__ = "carts"  # Optional, automatically inferred from the class name
+    # session lookups and the abandoned-cart sweep, see cart_service
+    __table_args__ = (Index("ix_carts_session_created", "session_id", "created_at"),)
     product_id: int=Field(foreign_key="products.id", nullable=False)
-    session_id: str = Field(nullable=False, index=True)
-    certificate_color: str = Field(nullable=True, index=True)
-    frame_color: str = Field(nullable=True, index=True)
-    frame_size: str = Field(nullable=True, index=True)
-    frame_thickness: str = Field(nullable=True, index=True)
+    session_id: str = Field(nullable=False)
+    certificate_color: str = Field(nullable=True)
+    frame_color: str = Field(nullable=True)
+    frame_size: str = Field(nullable=True)
+    frame_thickness: str = Field(nullable=True)
+
+
+# replaced by ix_carts_session_created or never queried; dropped at startup
+OBSOLETE_CART_INDEXES = [
+    "ix_carts_session_id",
+    "ix_carts_certificate_color",
+    "ix_carts_frame_color",
+    "ix_carts_frame_size",
+    "ix_carts_frame_thickness",
+]
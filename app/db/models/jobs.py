@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, Column, Index
+from sqlmodel import Field, SQLModel
+
+
+class ItemBase(SQLModel):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class Jobs(ItemBase, table=True):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_due", "status", "run_at"),)
+    kind: str = Field(nullable=False, index=True)
+    payload: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    status: str = Field(nullable=False)  # pending,running,dead
+    attempts: int = Field(default=0, nullable=False)
+    max_attempts: int = Field(nullable=False)
+    run_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    # lease held by a worker while the job runs
+    locked_by: str = Field(nullable=True)
+    locked_until: datetime = Field(nullable=True)
+    error: str = Field(nullable=True)
@@ -5,7 +5,7 @@ from typing import Optional
 from sqlalchemy import Column
 from sqlmodel import Field, SQLModel
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import JSON
+from sqlalchemy import JSON, Index, Text
 
 
 class ItemBase(SQLModel):
@@ -22,7 +22,7 @@ class order_selected_tags(
     )
     product_id: int = Field(foreign_key="products.id", nullable=False)
     order_id: int = Field(foreign_key="orders.id", nullable=True)
-    cart_id: int = Field(foreign_key="carts.id", nullable=True)
+    cart_id: int = Field(foreign_key="carts.id", nullable=True, index=True)
     tag_name: str = Field(nullable=False, index=True)
     tag_data: str = Field(nullable=True, index=True, max_length=100)
 
@@ -54,7 +54,7 @@ class Orders_status(ItemBase, table=True):
 class Orders(ItemBase, table=True):
     __tablename__ = "orders"  # Optional, automatically inferred from the class name
     user_id: int = Field(foreign_key="users.id", nullable=False)
-    txn_id: str = Field(nullable=True, index=True)
+    txn_id: str = Field(nullable=True, unique=True, index=True)
     shipping_fee: str = Field(nullable=True, index=True)
     c_gst: int = Field(nullable=True, index=True)
     s_gst: int = Field(nullable=True, index=True)
@@ -77,3 +77,53 @@ class Payment_details(ItemBase, table=True):
     payment_amount: int = Field(nullable=True, index=True)
     payment_status: str = Field(nullable=True, index=True)
     payment_response: Optional[dict] = Field(sa_column=Column(JSON))
+
+
+class Idempotency_keys(ItemBase, table=True):
+    __tablename__ = "idempotency_keys"
+    key: str = Field(nullable=False, unique=True, index=True, max_length=255)
+    status: str = Field(nullable=False, index=True)  # in_flight,completed
+    response_status: int = Field(nullable=True)
+    response_body: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+
+
+class Payment_webhook_events(ItemBase, table=True):
+    __tablename__ = "payment_webhook_events"
+    __table_args__ = (
+        Index("ix_payment_webhook_events_due", "status", "next_attempt_at"),
+    )
+    # sha256 of the raw body; gateway redeliveries of an event are stored once
+    payload_hash: str = Field(nullable=False, unique=True, index=True, max_length=64)
+    event_type: str = Field(nullable=True, index=True)
+    txn_id: str = Field(nullable=True, index=True)
+    payment_id: str = Field(nullable=True, index=True)
+    raw_body: str = Field(sa_column=Column(Text, nullable=False))
+    # pending,processing,processed,ignored,failed
+    status: str = Field(nullable=False, index=True)
+    attempts: int = Field(default=0, nullable=False)
+    # next retry while pending; lease expiry while processing
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    error: str = Field(nullable=True)
+
+
+class Order_summaries(ItemBase, table=True):
+    __tablename__ = "order_summaries"
+    # canonical order document shared by tracking, emails and invoices,
+    # see order_summary_service
+    order_id: int = Field(
+        foreign_key="orders.id", nullable=False, unique=True, index=True
+    )
+    txn_id: str = Field(nullable=False, unique=True, index=True)
+    document: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+
+
+class Order_documents(ItemBase, table=True):
+    __tablename__ = "order_documents"
+    # confirmation HTML rendered once per order and shared by the email and
+    # the invoice PDF, see order_document_service
+    order_id: int = Field(
+        foreign_key="orders.id", nullable=False, unique=True, index=True
+    )
+    txn_id: str = Field(nullable=False, unique=True, index=True)
+    html: str = Field(sa_column=Column(Text, nullable=False))
+    render_ms: float = Field(default=0, nullable=False)
@@ -4,7 +4,7 @@ from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import relationship
 from sqlmodel import SQLModel, Field, Relationship
 
-from sqlalchemy import Column, String, Text, Integer
+from sqlalchemy import Column, Index, String, Text, Integer, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import JSONB
 
 
@@ -68,7 +68,9 @@ class Product_images(ItemBase, table=True):
 
 class Product_Review_images(ItemBase, table=True):
     __tablename__ = "product_review_images"
-    product_rating_id: int = Field(foreign_key="product_rating.id", nullable=False)
+    product_rating_id: int = Field(
+        foreign_key="product_rating.id", nullable=False, index=True
+    )
     images: str = Field(nullable=True, index=True)
     # Define back relationship
     product_rating: Optional["Product_rating"] = Relationship(
@@ -78,6 +80,27 @@ class Product_Review_images(ItemBase, table=True):
 
 class Product_rating(ItemBase, table=True):
     __tablename__ = "product_rating"
+    # review feed indexes, see review_service.REVIEW_SORT_KEYS
+    __table_args__ = (
+        Index(
+            "ix_product_rating_feed_product_newest",
+            "product_id",
+            "status",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "ix_product_rating_feed_product_rating",
+            "product_id",
+            "status",
+            text("coalesce(rating, 0)"),
+            "id",
+        ),
+        Index("ix_product_rating_feed_newest", "status", "created_at", "id"),
+        Index(
+            "ix_product_rating_feed_rating", "status", text("coalesce(rating, 0)"), "id"
+        ),
+    )
     product_id: int = Field(foreign_key="products.id", nullable=False)
     # user_id: int=Field(foreign_key="users.id", nullable=False)
     user_name: str = Field(nullable=True, index=True)
@@ -88,8 +111,23 @@ class Product_rating(ItemBase, table=True):
 
     product: Optional["Products"] = Relationship(back_populates="product_ratings")
     product_review_images: List[Product_Review_images] = Relationship(
-        back_populates="product_rating", sa_relationship_kwargs={"lazy": "joined"}
+        back_populates="product_rating", sa_relationship_kwargs={"lazy": "select"}
+    )
+
+
+class Product_rating_summary(ItemBase, table=True):
+    __tablename__ = "product_rating_summary"
+    product_id: int = Field(
+        foreign_key="products.id", nullable=False, unique=True, index=True
     )
+    rating_count: int = Field(default=0, nullable=False)
+    rating_sum: int = Field(default=0, nullable=False)
+    rating_avg: float = Field(default=0, nullable=False)
+    star_1: int = Field(default=0, nullable=False)
+    star_2: int = Field(default=0, nullable=False)
+    star_3: int = Field(default=0, nullable=False)
+    star_4: int = Field(default=0, nullable=False)
+    star_5: int = Field(default=0, nullable=False)
 
 
 class Product_tag_options(ItemBase, table=True):
@@ -107,6 +145,15 @@ class Product_tag_options(ItemBase, table=True):
 
 class Products(ItemBase, table=True):
     __tablename__ = "products"
+    # keyset pagination indexes, one per sort in catalog_service.PRODUCT_SORT_KEYS
+    __table_args__ = (
+        Index("ix_products_sort_priority", text("coalesce(priority, 0)"), "id"),
+        Index(
+            "ix_products_sort_price", text("coalesce(CAST(price AS REAL), 0)"), "id"
+        ),
+        Index("ix_products_sort_newest", "created_at", "id"),
+        Index("ix_products_sort_rating", "rating_avg", "id"),
+    )
     product_name: str = Field(nullable=True, index=True)
     url_name: str = Field(nullable=True, index=True)
     offer_price: str = Field(nullable=True, index=True)
@@ -125,32 +172,61 @@ class Products(ItemBase, table=True):
 
     is_digital: bool = Field(nullable=True, index=True)
     product_category: str = Field(nullable=True, index=True)
+    # copy of Product_rating_summary.rating_avg kept in step by rating_service,
+    # so the rating sort can use an index on the products table
+    rating_avg: float = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": text("0")}
+    )
 
     # Define relationship correctly
+    # Children load lazily; routes choose eager loading through the
+    # profiles in app.db.loading_profiles
     product_images: List[Product_images] = Relationship(
-        back_populates="product", sa_relationship_kwargs={"lazy": "joined"}
+        back_populates="product", sa_relationship_kwargs={"lazy": "select"}
     )
 
     product_ratings: List[Product_rating] = Relationship(
-        back_populates="product", sa_relationship_kwargs={"lazy": "joined"}
+        back_populates="product", sa_relationship_kwargs={"lazy": "select"}
     )
 
     product_tag_options: List[Product_tag_options] = Relationship(
-        back_populates="product", sa_relationship_kwargs={"lazy": "joined"}
+        back_populates="product", sa_relationship_kwargs={"lazy": "select"}
     )
 
     certificate_colors: List[Certificate_colors] = Relationship(
-        back_populates="product", sa_relationship_kwargs={"lazy": "joined"}
+        back_populates="product", sa_relationship_kwargs={"lazy": "select"}
     )
     frame_colors: List[Frame_colors] = Relationship(
-        back_populates="product", sa_relationship_kwargs={"lazy": "joined"}
+        back_populates="product", sa_relationship_kwargs={"lazy": "select"}
     )
     frame_size: List[Frame_size] = Relationship(
-        back_populates="product", sa_relationship_kwargs={"lazy": "joined"}
+        back_populates="product", sa_relationship_kwargs={"lazy": "select"}
     )
     frame_thickness: List[Frame_Thickness] = Relationship(
-        back_populates="product", sa_relationship_kwargs={"lazy": "joined"}
+        back_populates="product", sa_relationship_kwargs={"lazy": "select"}
+    )
+    rating_summary: Optional[Product_rating_summary] = Relationship(
+        sa_relationship_kwargs={"lazy": "select", "uselist": False}
+    )
+
+
+class Similar_products(ItemBase, table=True):
+    __tablename__ = "similar_products"
+    __table_args__ = (
+        Index(
+            "ix_similar_products_lookup",
+            "product_id",
+            "rank",
+            "similar_product_id",
+        ),
+        UniqueConstraint(
+            "product_id", "similar_product_id", name="uq_similar_products_pair"
+        ),
     )
+    product_id: int = Field(foreign_key="products.id", nullable=False)
+    similar_product_id: int = Field(foreign_key="products.id", nullable=False)
+    score: float = Field(default=0, nullable=False)
+    rank: int = Field(default=0, nullable=False)
 
 
 class Product_shipping_rates(ItemBase, table=True):
@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import MetaData, create_engine, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn, CreateIndex, DropIndex
 from app.core.config import settings
+from app.core.logger import logger
 
 # Create the PostgreSQL engine
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
@@ -15,3 +18,78 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async engine for `async def` handlers, so their queries do not block the
+# event loop. Sync services run on it through `await db.run_sync(fn, ...)`.
+async_engine = create_async_engine(str(settings.SQLALCHEMY_ASYNC_DATABASE_URI))
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# create_all skips tables that already exist, so columns added to existing
+# models are added here. New columns need a server_default when they are not
+# nullable. Returns the columns that were added so callers can backfill them.
+def add_missing_columns(metadata: MetaData):
+    added = []
+    with engine.begin() as conn:
+        existing_tables = set(inspect(conn).get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {
+                column["name"] for column in inspect(conn).get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                definition = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(
+                    text(f'ALTER TABLE "{table.name}" ADD COLUMN {definition}')
+                )
+                added.append(column)
+    return added
+
+
+# create_all skips tables that already exist, so indexes added to existing
+# models would never reach an existing database without this
+def create_missing_indexes(metadata: MetaData):
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# An index that became unique in the models keeps its old non-unique
+# definition in existing databases; rebuild it. Duplicate rows make the
+# rebuild fail, which is logged and leaves the old index in place.
+def upgrade_unique_indexes(metadata: MetaData):
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            if not index.unique:
+                continue
+            with engine.connect() as conn:
+                existing = {
+                    item["name"]: item for item in inspect(conn).get_indexes(table.name)
+                }
+            if index.name not in existing or existing[index.name]["unique"]:
+                continue
+            try:
+                with engine.begin() as conn:
+                    conn.execute(DropIndex(index))
+                    conn.execute(CreateIndex(index))
+            except Exception as error:
+                logger.error(f"Could not make index {index.name} unique: {error}")
+
+
+def drop_obsolete_indexes(names):
+    with engine.begin() as conn:
+        for name in names:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
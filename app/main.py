@@ -1,19 +1,82 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api.main import api_router
 from app.core.config import settings
-from app.db.session import engine
+from app.core.logger import logger
+from app.db.models.carts import OBSOLETE_CART_INDEXES
+from app.db.models.product import Products
+from app.db.session import (
+    SessionLocal,
+    add_missing_columns,
+    async_engine,
+    create_missing_indexes,
+    drop_obsolete_indexes,
+    engine,
+    upgrade_unique_indexes,
+)
+from app.services.cart_service import run_cart_sweeper
+from app.services.cashfree_client import create_cashfree_client
+from app.services.catalog_service import rebuild_catalog_snapshot
+from app.services.payment_webhook_service import run_webhook_consumer
+from app.services.pricing_service import rebuild_pricing_snapshot
+from app.services.rating_service import sync_product_rating_averages
+from app.services.search_service import ensure_product_search_index
+from app.services.similarity_service import ensure_similar_products
+from app.worker import run_job_slots
 from sqlmodel import SQLModel
 from jinja2 import Environment, FileSystemLoader
 
 
 # Define the lifespan function
-def lifespan(app: FastAPI):
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     # Code executed on startup
     SQLModel.metadata.create_all(bind=engine)
-    yield  # App runs here
+    added_columns = add_missing_columns(SQLModel.metadata)
+    create_missing_indexes(SQLModel.metadata)
+    upgrade_unique_indexes(SQLModel.metadata)
+    drop_obsolete_indexes(OBSOLETE_CART_INDEXES)
+    ensure_product_search_index(engine)
+    with SessionLocal() as db:
+        if Products.__table__.c.rating_avg in added_columns:
+            sync_product_rating_averages(db)
+            db.commit()
+        # the similar-products index feeds the catalog ETag, so it goes first
+        ensure_similar_products(db)
+        rebuild_catalog_snapshot(db)
+        rebuild_pricing_snapshot(db)
+    app.state.cashfree = create_cashfree_client()
+    background = [
+        asyncio.create_task(run_webhook_consumer()),
+        asyncio.create_task(run_cart_sweeper()),
+    ]
+    jobs_stopping = asyncio.Event()
+    jobs = None
+    if settings.JOB_WORKER_IN_WEB:
+        # dev opt-in; claims are leased, so this can run next to app.worker
+        jobs = asyncio.create_task(
+            run_job_slots(settings.JOB_WORKER_CONCURRENCY, jobs_stopping)
+        )
+    try:
+        yield  # App runs here
+    finally:
+        for task in background:
+            task.cancel()
+        if jobs is not None:
+            jobs_stopping.set()
+            try:
+                await asyncio.wait_for(
+                    jobs, timeout=settings.JOB_SHUTDOWN_GRACE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # wait_for cancelled them; unfinished jobs retry after the lease
+                logger.warning("Job slots did not stop in time")
+        await app.state.cashfree.aclose()
+        await async_engine.dispose()
 
 
 app = FastAPI(
@@ -34,6 +97,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -89,3 +89,22 @@ class SettingsSchema(BaseModel):
     pricesWithShipping: str
     taxRate: int
     shippingCharges: int
+
+
+class CartTagSelection(SQLModel):
+    name: str
+    data: Optional[str] = Field(default=None, max_length=100)
+
+
+class CartItemPayload(SQLModel):
+    product_id: int
+    certificate_color: Optional[str] = None
+    frame_color: Optional[str] = None
+    frame_size: Optional[str] = None
+    frame_thickness: Optional[str] = None
+    tag_options: List[CartTagSelection] = []
+
+
+class BatchAddToCartPayload(SQLModel):
+    session_id: str
+    items: List[CartItemPayload]
@@ -148,7 +148,7 @@ class ProductTagCreate(BaseModel):
 # --- Pydantic Response Models ---
 class TagOptionResponse(BaseModel):
     tag_name: str
-    tag_data: str
+    tag_data: Optional[str] = None
 
 
 class CartDetailsResponse(BaseModel):
@@ -158,3 +158,10 @@ class CartDetailsResponse(BaseModel):
     product_name: str
     price: int
     thumbnail: str
+    selected_tags: List[TagOptionResponse] = []
+
+
+class CartSummaryResponse(BaseModel):
+    session_id: str
+    item_count: int
+    items: List[CartDetailsResponse]
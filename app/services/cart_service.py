@@ -0,0 +1,292 @@
+import asyncio
+import itertools
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.models.carts import Carts
+from app.db.models.orders import order_selected_tags
+from app.db.models.product import Products
+from app.db.session import SessionLocal
+from app.schemas.request import CartItemPayload
+from app.services.catalog_service import CatalogSnapshot, get_catalog_snapshot
+from app.utils.cache import TTLCache
+
+
+# ----------------------------------------cart read path---------------------------------
+
+# session_id -> (catalog snapshot version, cart lines)
+cart_cache = TTLCache(
+    ttl=settings.CART_CACHE_TTL_SECONDS, maxsize=settings.CART_CACHE_MAX_SESSIONS
+)
+# session_id -> generation, replaced on every invalidation. A load only caches
+# its rows if the generation it started with is still current, so a load that
+# raced an invalidation can not put stale rows back.
+cart_generations = TTLCache(
+    ttl=settings.CART_CACHE_TTL_SECONDS, maxsize=settings.CART_CACHE_MAX_SESSIONS
+)
+_generation_counter = itertools.count(1)
+_generation_lock = threading.Lock()
+
+
+def _cart_generation(session_id: str) -> int:
+    with _generation_lock:
+        generation = cart_generations.get(session_id)
+        if generation is None:
+            generation = next(_generation_counter)
+            cart_generations.set(session_id, generation)
+        return generation
+
+
+def invalidate_cart(session_id: str) -> None:
+    # call after any write to the session's carts or their selected tags
+    with _generation_lock:
+        cart_generations.set(session_id, next(_generation_counter))
+        cart_cache.invalidate(session_id)
+
+
+def load_cart_details(db: Session, session_id: str) -> List[Dict[str, Any]]:
+    """
+    Cart lines of a session with their product summary and selected tags,
+    in three queries regardless of cart size.
+    """
+    carts = (
+        db.query(Carts)
+        .filter(Carts.session_id == session_id)
+        .order_by(Carts.id)
+        .all()
+    )
+    if not carts:
+        return []
+
+    product_ids = {cart.product_id for cart in carts}
+    products = {
+        product.id: product
+        for product in db.query(
+            Products.id,
+            Products.product_name,
+            Products.price,
+            Products.is_digital,
+            Products.thumbnail,
+        ).filter(Products.id.in_(product_ids))
+    }
+
+    tags = defaultdict(list)
+    tag_rows = (
+        db.query(
+            order_selected_tags.cart_id,
+            order_selected_tags.tag_name,
+            order_selected_tags.tag_data,
+        )
+        .filter(order_selected_tags.cart_id.in_([cart.id for cart in carts]))
+        .order_by(order_selected_tags.id)
+    )
+    for tag in tag_rows:
+        tags[tag.cart_id].append({"tag_name": tag.tag_name, "tag_data": tag.tag_data})
+
+    result = []
+    for cart in carts:
+        product = products.get(cart.product_id)
+        if product is None:
+            continue
+        result.append(
+            {
+                "cart_id": cart.id,
+                "product_id": cart.product_id,
+                "product_name": product.product_name,
+                "price": product.price,
+                "is_digital": product.is_digital,
+                "thumbnail": product.thumbnail,
+                "selected_tags": tags[cart.id],
+            }
+        )
+    return result
+
+
+def get_session_cart(db: Session, session_id: str) -> List[Dict[str, Any]]:
+    # cached lines are reused only while the catalog (prices, names) is unchanged
+    version = get_catalog_snapshot(db).version
+    cached = cart_cache.get(session_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    generation = _cart_generation(session_id)
+    cart = load_cart_details(db, session_id)
+    if cart:
+        with _generation_lock:
+            # an expired or evicted generation also skips caching
+            if cart_generations.get(session_id) == generation:
+                cart_cache.set(session_id, (version, cart))
+    return cart
+
+
+# ----------------------------------------batch add to cart---------------------------------
+
+# cart item field -> option group of catalog_service.OPTION_MODELS
+CART_OPTION_FIELDS = {
+    "certificate_color": "certificate_colors",
+    "frame_color": "frame_colors",
+    "frame_size": "frame_size",
+    "frame_thickness": "frame_thickness",
+}
+
+
+def validate_cart_item(snapshot: CatalogSnapshot, item: CartItemPayload) -> None:
+    # checked against the snapshot's option matrix, so validation costs no queries
+    if item.product_id not in snapshot.products_by_id:
+        raise ValueError(f"Product {item.product_id} is not available")
+    options = snapshot.options_by_product.get(item.product_id, {})
+
+    for field, group in CART_OPTION_FIELDS.items():
+        value = getattr(item, field)
+        allowed = {option["name"] for option in options.get(group, [])}
+        # a product without options in a group accepts no value for it
+        if value and value not in allowed:
+            raise ValueError(
+                f"Invalid {field} '{value}' for product {item.product_id}"
+            )
+
+    tag_names = {option["name"] for option in options.get("tag_options", [])}
+    for tag in item.tag_options:
+        if tag.name not in tag_names:
+            raise ValueError(
+                f"Invalid tag option '{tag.name}' for product {item.product_id}"
+            )
+
+
+def add_cart_items(
+    db: Session, session_id: str, items: List[CartItemPayload]
+) -> List[Dict[str, Any]]:
+    """
+    Validate and insert several cart lines with their tag selections using
+    two bulk inserts and one commit. Returns the session's updated cart.
+    """
+    if not items:
+        raise ValueError("No cart items given")
+    if len(items) > settings.CART_BATCH_MAX_ITEMS:
+        raise ValueError(f"At most {settings.CART_BATCH_MAX_ITEMS} items per request")
+    snapshot = get_catalog_snapshot(db)
+    for item in items:
+        validate_cart_item(snapshot, item)
+
+    now = datetime.utcnow()
+    try:
+        cart_ids = db.scalars(
+            insert(Carts).returning(Carts.id, sort_by_parameter_order=True),
+            [
+                {
+                    "product_id": item.product_id,
+                    "session_id": session_id,
+                    **{field: getattr(item, field) for field in CART_OPTION_FIELDS},
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for item in items
+            ],
+        ).all()
+        tag_rows = [
+            {
+                "product_id": item.product_id,
+                "cart_id": cart_id,
+                "tag_name": tag.name,
+                "tag_data": tag.data,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for item, cart_id in zip(items, cart_ids)
+            for tag in item.tag_options
+        ]
+        if tag_rows:
+            db.execute(insert(order_selected_tags), tag_rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    invalidate_cart(session_id)
+    return get_session_cart(db, session_id)
+
+
+# ----------------------------------------abandoned cart sweeper---------------------------------
+
+
+def sweep_abandoned_carts(
+    db: Session, ttl_hours: Optional[int] = None, batch_size: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Delete the carts of sessions whose newest line is older than `ttl_hours`,
+    with their selected tags. Each batch of at most `batch_size` cart lines is
+    its own short transaction, so the write lock is never held for long.
+    """
+    ttl_hours = settings.CART_TTL_HOURS if ttl_hours is None else ttl_hours
+    batch_size = batch_size or settings.CART_SWEEP_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    expired_sessions = (
+        db.query(Carts.session_id)
+        .group_by(Carts.session_id)
+        .having(func.max(Carts.created_at) < cutoff)
+    )
+    reclaimed = {"sessions": 0, "carts": 0, "tags": 0}
+    while True:
+        rows = (
+            db.query(Carts.id, Carts.session_id)
+            .filter(Carts.session_id.in_(expired_sessions.scalar_subquery()))
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        cart_ids = [row.id for row in rows]
+        sessions = {row.session_id for row in rows}
+        try:
+            reclaimed["tags"] += (
+                db.query(order_selected_tags)
+                .filter(order_selected_tags.cart_id.in_(cart_ids))
+                .delete(synchronize_session=False)
+            )
+            reclaimed["carts"] += (
+                db.query(Carts)
+                .filter(Carts.id.in_(cart_ids))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        reclaimed["sessions"] += len(sessions)
+        for session_id in sessions:
+            invalidate_cart(session_id)
+    return reclaimed
+
+
+def sweep_abandoned_carts_job() -> Dict[str, int]:
+    with SessionLocal() as db:
+        reclaimed = sweep_abandoned_carts(db)
+    if reclaimed["carts"]:
+        logger.info(
+            f"Cart sweep reclaimed {reclaimed['carts']} carts and "
+            f"{reclaimed['tags']} tags from {reclaimed['sessions']} sessions"
+        )
+    return reclaimed
+
+
+async def run_cart_sweeper() -> None:
+    # lifespan task: sweep once per CART_SWEEP_INTERVAL_MINUTES
+    while True:
+        try:
+            await run_in_threadpool(sweep_abandoned_carts_job)
+        except Exception as error:
+            logger.error(f"Cart sweep failed: {error}")
+        await asyncio.sleep(settings.CART_SWEEP_INTERVAL_MINUTES * 60)
+
+
+if __name__ == "__main__":
+    # python -m app.services.cart_service
+    print(sweep_abandoned_carts_job())
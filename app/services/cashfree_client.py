@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.logger import logger
+
+
+# ----------------------------------------cashfree payment gateway client---------------------------------
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class PaymentGatewayUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. The first call after that is let through as
+    a probe: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            raise PaymentGatewayUnavailable("Payment gateway temporarily unavailable")
+        if self.state == "half-open":
+            # let one probe through; others are rejected until it finishes
+            self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.error("Cashfree circuit breaker opened")
+            self.opened_at = time.monotonic()
+
+
+class CashfreeClient:
+    """
+    One keep-alive connection pool per process, created and closed by the app
+    lifespan. GETs are retried with jittered exponential backoff; POSTs are
+    sent once.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_retries = settings.CASHFREE_MAX_RETRIES
+        self.backoff_base = settings.CASHFREE_BACKOFF_BASE
+        self.breaker = CircuitBreaker(
+            settings.CASHFREE_BREAKER_FAILURES, settings.CASHFREE_BREAKER_RESET_SECONDS
+        )
+        self.client = httpx.AsyncClient(
+            base_url=settings.CASHFREE_BASE_URL,
+            headers={
+                "x-client-id": settings.CASHFREE_CLIENT_ID,
+                "x-client-secret": settings.CASHFREE_CLIENT_SECRET,
+                "x-api-version": settings.CASHFREE_API_VERSION,  # Required!
+                "Content-Type": "application/json",
+            },
+            timeout=httpx.Timeout(
+                settings.CASHFREE_READ_TIMEOUT, connect=settings.CASHFREE_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.CASHFREE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CASHFREE_MAX_CONNECTIONS,
+            ),
+            # the ASGI transport of the fake gateway speaks HTTP/1.1 only
+            http2=transport is None,
+            transport=transport,
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter keeps retrying workers from hitting the gateway in step
+        return random.uniform(0, self.backoff_base * 2**attempt)
+
+    async def request(
+        self, method: str, path: str, json: Optional[Dict[str, Any]] = None
+    ) -> httpx.Response:
+        attempts = self.max_retries + 1 if method == "GET" else 1
+        for attempt in range(attempts):
+            self.breaker.before_call()
+            try:
+                response = await self.client.request(method, path, json=json)
+            except httpx.TransportError as error:
+                self.breaker.record_failure()
+                if attempt + 1 == attempts:
+                    raise PaymentGatewayUnavailable(
+                        f"Payment gateway request failed: {error}"
+                    ) from error
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                if response.status_code not in RETRYABLE_STATUS or attempt + 1 == attempts:
+                    return response
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def create_order(self, payload: Dict[str, Any]) -> httpx.Response:
+        return await self.request("POST", "/orders", json=payload)
+
+    async def get_order(self, order_id: str) -> httpx.Response:
+        return await self.request("GET", f"/orders/{order_id}")
+
+    async def get_order_payments(self, order_id: str) -> httpx.Response:
+        return await self.request("GET", f"/orders/{order_id}/payments")
+
+
+def create_cashfree_client() -> CashfreeClient:
+    transport = None
+    if settings.CASHFREE_FAKE:
+        from app.services.cashfree_fake import fake_cashfree_app
+
+        transport = httpx.ASGITransport(app=fake_cashfree_app)
+    return CashfreeClient(transport=transport)
+
+
+def get_cashfree_client(request: Request) -> CashfreeClient:
+    # the client is created by the app lifespan, see app.main
+    return request.app.state.cashfree
@@ -0,0 +1,70 @@
+import asyncio
+import random
+from datetime import datetime
+from typing import Any, Dict
+
+from fastapi import FastAPI, HTTPException, Request
+
+from app.core.config import settings
+
+
+# ----------------------------------------offline cashfree gateway---------------------------------
+# In-process stand-in for the Cashfree PG orders API, mounted through
+# httpx.ASGITransport when CASHFREE_FAKE is set. Every order is paid at once,
+# so checkout can be load-tested without network access.
+
+fake_cashfree_app = FastAPI(title="Fake Cashfree")
+_orders: Dict[str, Dict[str, Any]] = {}
+
+
+async def _latency() -> None:
+    if settings.CASHFREE_FAKE_LATENCY_MS:
+        jitter = random.uniform(0.5, 1.5)
+        await asyncio.sleep(settings.CASHFREE_FAKE_LATENCY_MS * jitter / 1000)
+
+
+def _payment(order: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "cf_payment_id": f"fake-{order['order_id']}",
+        "order_id": order["order_id"],
+        "payment_amount": order["order_amount"],
+        "payment_currency": order["order_currency"],
+        "payment_status": "SUCCESS",
+        "payment_method": {"upi": {"channel": "collect"}},
+        "payment_time": order["created_at"],
+    }
+
+
+@fake_cashfree_app.post("/pg/orders")
+async def create_order(request: Request):
+    await _latency()
+    data = await request.json()
+    order_id = data.get("order_id") or f"fake_order_{len(_orders) + 1}"
+    order = {
+        "cf_order_id": str(len(_orders) + 1),
+        "order_id": order_id,
+        "order_amount": data.get("order_amount"),
+        "order_currency": data.get("order_currency", "INR"),
+        "customer_details": data.get("customer_details", {}),
+        "order_status": "PAID",
+        "payment_session_id": f"session_fake_{order_id}",
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    _orders[order_id] = order
+    return order
+
+
+@fake_cashfree_app.get("/pg/orders/{order_id}")
+async def get_order(order_id: str):
+    await _latency()
+    if order_id not in _orders:
+        raise HTTPException(status_code=404, detail="order not found")
+    return _orders[order_id]
+
+
+@fake_cashfree_app.get("/pg/orders/{order_id}/payments")
+async def get_order_payments(order_id: str):
+    await _latency()
+    if order_id not in _orders:
+        raise HTTPException(status_code=404, detail="order not found")
+    return [_payment(_orders[order_id])]
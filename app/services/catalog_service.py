@@ -0,0 +1,357 @@
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import REAL, cast, func, literal_column
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.loading_profiles import product_query
+from app.db.models.banner import Banners, Category
+from app.db.models.product import (
+    Certificate_colors,
+    Frame_colors,
+    Frame_size,
+    Frame_Thickness,
+    Product_images,
+    Product_rating,
+    Product_rating_summary,
+    Product_Review_images,
+    Product_tag_options,
+    Products,
+    Similar_products,
+)
+from app.services.rating_service import serialize_rating_summary
+from app.utils.pagination import SortKey, row_value
+
+
+# ----------------------------------------catalog read model---------------------------------
+
+
+def _price(product: Any) -> float:
+    try:
+        return float(row_value(product, "price"))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# Each sort is backed by a matching index on Products (see __table_args__)
+PRODUCT_SORT_KEYS = {
+    "priority": SortKey(
+        name="priority",
+        columns=(func.coalesce(Products.priority, literal_column("0")), Products.id),
+        row_key=lambda product: (
+            row_value(product, "priority") or 0,
+            row_value(product, "id"),
+        ),
+    ),
+    "price": SortKey(
+        name="price",
+        columns=(
+            func.coalesce(cast(Products.price, REAL), literal_column("0")),
+            Products.id,
+        ),
+        row_key=lambda product: (_price(product), row_value(product, "id")),
+    ),
+    "newest": SortKey(
+        name="newest",
+        columns=(Products.created_at, Products.id),
+        row_key=lambda product: (
+            row_value(product, "created_at"),
+            row_value(product, "id"),
+        ),
+        descending=True,
+        parse=lambda values: (datetime.fromisoformat(values[0]), values[1]),
+    ),
+    "rating": SortKey(
+        name="rating",
+        columns=(Products.rating_avg, Products.id),
+        row_key=lambda product: (
+            row_value(product, "rating_avg") or 0.0,
+            row_value(product, "id"),
+        ),
+        descending=True,
+    ),
+}
+
+
+def get_product_sort(sort: str) -> SortKey:
+    if sort not in PRODUCT_SORT_KEYS:
+        raise ValueError(
+            f"Invalid sort '{sort}', expected one of: {', '.join(PRODUCT_SORT_KEYS)}"
+        )
+    return PRODUCT_SORT_KEYS[sort]
+
+
+# Every table a storefront catalog response is built from, including the
+# similar-products index the product detail route returns. Their row counts and
+# latest updated_at feed the snapshot ETag, so inserts, updates and deletes in
+# any of them produce a new validator.
+CATALOG_MODELS = [
+    Banners,
+    Category,
+    Products,
+    Product_images,
+    Product_rating,
+    Product_rating_summary,
+    Product_Review_images,
+    Product_tag_options,
+    Certificate_colors,
+    Frame_colors,
+    Frame_size,
+    Frame_Thickness,
+    Similar_products,
+]
+
+
+# Per-product option tables served by the option matrix, keyed by response name.
+# Only rows with status=True are offered; tag options have no status column.
+OPTION_MODELS = {
+    "certificate_colors": Certificate_colors,
+    "frame_colors": Frame_colors,
+    "frame_size": Frame_size,
+    "frame_thickness": Frame_Thickness,
+    "tag_options": Product_tag_options,
+}
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    # order in which rebuilds started, so a slow older one never replaces it
+    build: int
+    built_at: datetime
+    # CATALOG_MODELS counts and max(id, updated_at) the snapshot was built
+    # from, compared with the database by get_catalog_snapshot
+    source: str
+    # validators shared by every worker that built from the same data
+    etag: str
+    last_modified: datetime
+    banners: List[Dict[str, Any]]
+    categories: List[Dict[str, Any]]
+    products: List[Dict[str, Any]]
+    products_by_id: Dict[int, Dict[str, Any]]
+    # products ordered ascending by each PRODUCT_SORT_KEYS row key
+    sorted_products: Dict[str, List[Dict[str, Any]]]
+    # product id -> OPTION_MODELS name -> rows sorted by priority
+    options_by_product: Dict[int, Dict[str, List[Dict[str, Any]]]]
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_version = 0
+_builds_started = 0
+# monotonic time of the last freshness check
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _serialize(rows) -> List[Dict[str, Any]]:
+    return [jsonable_encoder(row) for row in rows]
+
+
+def _load_tag_optional(option: Dict[str, Any]) -> Dict[str, Any]:
+    value = option.get("tag_optional")
+    if value and isinstance(value, str):
+        try:
+            option["tag_optional"] = json.loads(value)
+        except json.JSONDecodeError:
+            option["tag_optional"] = {}
+    return option
+
+
+def _load_product_options(db: Session) -> Dict[int, Dict[str, List[Dict[str, Any]]]]:
+    # one query per option table for the whole catalog
+    options = {}
+    for name, model in OPTION_MODELS.items():
+        query = db.query(model)
+        if hasattr(model, "status"):
+            query = query.filter(model.status == True)
+        rows = query.order_by(
+            model.product_id, func.coalesce(model.priority, literal_column("0")), model.id
+        ).all()
+        for row in _serialize(rows):
+            if model is Product_tag_options:
+                _load_tag_optional(row)
+            product_options = options.setdefault(
+                row["product_id"], {key: [] for key in OPTION_MODELS}
+            )
+            product_options[name].append(row)
+    return options
+
+
+def _catalog_source(db: Session) -> Tuple[str, datetime]:
+    # one aggregate query per CATALOG_MODELS table: any insert, update or
+    # delete changes the result. Returns it with the latest updated_at.
+    parts = []
+    last_modified = datetime.min
+    for model in CATALOG_MODELS:
+        count, max_id, max_updated_at = db.query(
+            func.count(model.id), func.max(model.id), func.max(model.updated_at)
+        ).one()
+        parts.append(f"{model.__tablename__}:{count}:{max_id}:{max_updated_at};")
+        if max_updated_at and max_updated_at > last_modified:
+            last_modified = max_updated_at
+    return "".join(parts), last_modified
+
+
+def rebuild_catalog_snapshot(db: Session) -> CatalogSnapshot:
+    """
+    Rebuild the in-memory catalog from the database and swap it in atomically.
+    Readers keep using the previous snapshot until the new one is complete.
+    """
+    global _snapshot, _version, _builds_started
+    # The queries run outside the lock: on the async engine they yield to the
+    # event loop, and another coroutine blocking on a held threading.Lock
+    # would stall the loop for good. The lock only guards the swap, and a
+    # build that started before the current snapshot's is thrown away.
+    with _lock:
+        _builds_started += 1
+        build = _builds_started
+
+    # read before the data, so a write landing mid-build leaves the source
+    # behind and the next freshness check rebuilds again
+    source, last_modified = _catalog_source(db)
+    banners = _serialize(db.query(Banners).order_by(Banners.id).all())
+    categories = _serialize(db.query(Category).order_by(Category.id).all())
+    products = _serialize(
+        product_query(db)
+        .filter(Products.status == True)
+        .order_by(Products.id)
+        .all()
+    )
+    summaries = {
+        summary.product_id: summary
+        for summary in db.query(Product_rating_summary).all()
+    }
+    for product in products:
+        product["rating_summary"] = serialize_rating_summary(
+            summaries.get(product["id"])
+        )
+
+    options_by_product = _load_product_options(db)
+
+    fingerprint = hashlib.sha256(source.encode())
+    fingerprint.update(
+        json.dumps(
+            [banners, categories, products, options_by_product], sort_keys=True
+        ).encode()
+    )
+
+    built_at = datetime.utcnow()
+    etag = fingerprint.hexdigest()[:32]
+    sorted_products = {
+        name: sorted(products, key=sort.row_key)
+        for name, sort in PRODUCT_SORT_KEYS.items()
+    }
+
+    with _lock:
+        if _snapshot is not None and _snapshot.build > build:
+            return _snapshot
+        if _snapshot is not None:
+            # deletes do not move max(updated_at), so a changed catalog is
+            # stamped with the rebuild time instead
+            last_modified = (
+                _snapshot.last_modified if _snapshot.etag == etag else built_at
+            )
+        elif last_modified == datetime.min:
+            last_modified = built_at
+
+        _version += 1
+        _snapshot = CatalogSnapshot(
+            version=_version,
+            build=build,
+            built_at=built_at,
+            source=source,
+            etag=etag,
+            last_modified=last_modified,
+            banners=banners,
+            categories=categories,
+            products=products,
+            products_by_id={product["id"]: product for product in products},
+            sorted_products=sorted_products,
+            options_by_product=options_by_product,
+        )
+        return _snapshot
+
+
+def get_catalog_snapshot(db: Session) -> CatalogSnapshot:
+    """
+    The current snapshot. refresh_catalog only rebuilds the process that
+    handled the write, so at most every CATALOG_FRESHNESS_CHECK_SECONDS the
+    snapshot's source is compared with the database and rebuilt on change.
+    """
+    global _checked_at
+    snapshot = _snapshot
+    if snapshot is None:
+        return rebuild_catalog_snapshot(db)
+    now = time.monotonic()
+    if now - _checked_at < settings.CATALOG_FRESHNESS_CHECK_SECONDS:
+        return snapshot
+    _checked_at = now
+    source, _ = _catalog_source(db)
+    if source != snapshot.source:
+        snapshot = rebuild_catalog_snapshot(db)
+    return snapshot
+
+
+def refresh_catalog(db: Session) -> None:
+    # Called after admin catalog writes have been committed. A failed rebuild
+    # drops the snapshot so the next storefront read rebuilds it lazily.
+    global _snapshot
+    try:
+        rebuild_catalog_snapshot(db)
+    except Exception as error:
+        logger.error(f"Catalog snapshot rebuild failed: {error}")
+        with _lock:
+            _snapshot = None
+
+
+def filter_products(
+    snapshot: CatalogSnapshot,
+    product_type: Optional[str] = "",
+    product_category: Optional[str] = "",
+    product_ids: Optional[List[int]] = None,
+    sort: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    # product_ids restricts the result to those products, kept in that order
+    # unless a sort is given
+    if sort:
+        products = snapshot.sorted_products[sort]
+        if product_ids is not None:
+            wanted = set(product_ids)
+            products = [product for product in products if product["id"] in wanted]
+    elif product_ids is not None:
+        products = [
+            snapshot.products_by_id[product_id]
+            for product_id in product_ids
+            if product_id in snapshot.products_by_id
+        ]
+    else:
+        products = snapshot.products
+
+    result = []
+    for product in products:
+        if product_type and product["product_type"] != product_type:
+            continue
+        if product_category and product["product_category"] != product_category:
+            continue
+        result.append(product)
+    return result
+
+
+def get_product_options(
+    snapshot: CatalogSnapshot, product_ids: List[int]
+) -> Dict[int, Dict[str, List[Dict[str, Any]]]]:
+    # every requested product gets all option groups, empty when it has none
+    return {
+        product_id: snapshot.options_by_product.get(
+            product_id, {name: [] for name in OPTION_MODELS}
+        )
+        for product_id in dict.fromkeys(product_ids)
+    }
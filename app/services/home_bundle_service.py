@@ -0,0 +1,104 @@
+import gzip
+import json
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+from app.services.catalog_service import CatalogSnapshot, filter_products
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is served instead
+    brotli = None
+
+
+# ----------------------------------------home page bundle---------------------------------
+
+# preferred order when the client accepts several encodings
+ENCODINGS = ("br", "gzip", "identity")
+
+
+@dataclass(frozen=True)
+class HomeBundle:
+    version: int
+    # encoding -> encoded JSON payload
+    bodies: Dict[str, bytes]
+
+
+_bundle: Optional[HomeBundle] = None
+_lock = threading.Lock()
+
+
+def _priority(value) -> Tuple[int, int]:
+    # rows without a priority go last
+    return (value is None, value or 0)
+
+
+def build_home_payload(snapshot: CatalogSnapshot) -> Dict:
+    banners = sorted(
+        snapshot.banners,
+        key=lambda banner: (_priority(banner["banner_priority"]), banner["id"]),
+    )
+    categories = sorted(
+        snapshot.categories,
+        key=lambda category: (_priority(category["cat_priority"]), category["id"]),
+    )
+    sections = {
+        product_type: filter_products(
+            snapshot, product_type=product_type, sort="priority"
+        )[: settings.HOME_BUNDLE_SECTION_LIMIT]
+        for product_type in settings.HOME_BUNDLE_PRODUCT_TYPES
+    }
+    return {"banners": banners, "categories": categories, "products": sections}
+
+
+def _encode(payload: Dict) -> Dict[str, bytes]:
+    raw = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+    bodies = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(raw, quality=11)
+    return bodies
+
+
+def get_home_bundle(snapshot: CatalogSnapshot) -> HomeBundle:
+    """
+    Encoded bundle for the snapshot's catalog version. A new snapshot version
+    (every admin catalog write) makes the next call rebuild it once.
+    """
+    global _bundle
+    bundle = _bundle
+    if bundle is not None and bundle.version == snapshot.version:
+        return bundle
+    with _lock:
+        if _bundle is None or _bundle.version != snapshot.version:
+            _bundle = HomeBundle(
+                version=snapshot.version, bodies=_encode(build_home_payload(snapshot))
+            )
+        return _bundle
+
+
+def negotiate_encoding(accept_encoding: Optional[str], bodies: Dict[str, bytes]) -> str:
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for encoding in ENCODINGS:
+        if encoding not in bodies or encoding == "identity":
+            continue
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return "identity"
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.orders import Idempotency_keys
+
+
+# ----------------------------------------idempotent requests---------------------------------
+
+IN_FLIGHT = "in_flight"
+COMPLETED = "completed"
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+def _claim(db: Session, key: str, now: datetime) -> bool:
+    # the unique key makes the insert the lock: only one request wins it
+    result = db.execute(
+        insert(Idempotency_keys)
+        .values(key=key, status=IN_FLIGHT, created_at=now, updated_at=now)
+        .on_conflict_do_nothing(index_elements=[Idempotency_keys.key])
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def claim_idempotency_key(db: Session, key: str) -> Optional[Idempotency_keys]:
+    """
+    Take the in-flight lock for `key`. Returns None when the caller should do
+    the work, or the completed record whose stored response must be replayed.
+    Raises IdempotencyConflict while another request holds the lock.
+    """
+    now = datetime.utcnow()
+    if _claim(db, key, now):
+        return None
+
+    record = db.query(Idempotency_keys).filter(Idempotency_keys.key == key).first()
+    if record is None:
+        # released between our insert and select
+        if _claim(db, key, now):
+            return None
+        raise IdempotencyConflict("Request with this key is already in progress")
+
+    expired = record.created_at < now - timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+    if record.status == COMPLETED and not expired:
+        return record
+
+    stale = record.updated_at < now - timedelta(
+        seconds=settings.IDEMPOTENCY_LOCK_SECONDS
+    )
+    if record.status == IN_FLIGHT and not stale:
+        raise IdempotencyConflict("Request with this key is already in progress")
+
+    # expired response or abandoned lock: take it over unless another retry
+    # got there first
+    taken = (
+        db.query(Idempotency_keys)
+        .filter(
+            Idempotency_keys.id == record.id,
+            Idempotency_keys.updated_at == record.updated_at,
+        )
+        .update(
+            {
+                Idempotency_keys.status: IN_FLIGHT,
+                Idempotency_keys.response_status: None,
+                Idempotency_keys.response_body: None,
+                Idempotency_keys.created_at: now,
+                Idempotency_keys.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not taken:
+        raise IdempotencyConflict("Request with this key is already in progress")
+    return None
+
+
+def complete_idempotency_key(
+    db: Session, key: str, response_status: int, response_body: Any
+) -> None:
+    db.query(Idempotency_keys).filter(Idempotency_keys.key == key).update(
+        {
+            Idempotency_keys.status: COMPLETED,
+            Idempotency_keys.response_status: response_status,
+            Idempotency_keys.response_body: response_body,
+            Idempotency_keys.updated_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def release_idempotency_key(db: Session, key: str) -> None:
+    # failed attempts are not stored, so the client can retry them
+    db.rollback()
+    db.query(Idempotency_keys).filter(
+        Idempotency_keys.key == key, Idempotency_keys.status == IN_FLIGHT
+    ).delete(synchronize_session=False)
+    db.commit()
@@ -0,0 +1,177 @@
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import pdfkit
+
+from app.core.config import settings
+from app.core.logger import logger
+
+
+# ----------------------------------------invoice pdf rendering---------------------------------
+# wkhtmltopdf is CPU heavy; invoices render in a process pool of
+# INVOICE_RENDER_WORKERS so they never take the CPU from request handling.
+# At most INVOICE_RENDER_QUEUE_DEPTH invoices are in flight at once; callers
+# beyond that wait up to INVOICE_RENDER_TIMEOUT_SECONDS for a slot.
+
+PDF_KIT_OPTIONS = {
+    "page-size": "A4",
+    "margin-top": "0.0in",
+    "margin-right": "0.2in",
+    "margin-bottom": "0.0in",
+    "margin-left": "0.2in",
+    "minimum-font-size": "20",
+    "enable-local-file-access": None,
+}
+
+
+class InvoiceQueueFull(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class RenderedInvoice:
+    pdf: bytes
+    # wall time inside the pool process, without queueing
+    render_seconds: float
+
+
+def render_invoice_pdf(html: str) -> Tuple[bytes, float]:
+    # module level so the pool can pickle it
+    started = time.perf_counter()
+    pdf = pdfkit.from_string(html, False, options=PDF_KIT_OPTIONS)
+    return pdf, time.perf_counter() - started
+
+
+class InvoiceRenderer:
+    def __init__(
+        self,
+        workers: int = settings.INVOICE_RENDER_WORKERS,
+        queue_depth: int = settings.INVOICE_RENDER_QUEUE_DEPTH,
+        timeout: float = settings.INVOICE_RENDER_TIMEOUT_SECONDS,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # started on first use, so importing this module spawns nothing
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def submit(self, html: str) -> "Future[Tuple[bytes, float]]":
+        if not self._slots.acquire(timeout=self.timeout):
+            raise InvoiceQueueFull("Invoice render queue is full")
+        try:
+            future = self._get_pool().submit(render_invoice_pdf, html)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def render(self, html: str) -> RenderedInvoice:
+        pdf, seconds = self.submit(html).result(timeout=self.timeout)
+        return RenderedInvoice(pdf=pdf, render_seconds=seconds)
+
+    def render_batch(self, htmls: List[str]) -> List[RenderedInvoice]:
+        # submitted together so the pool works on them in parallel; results
+        # come back in input order
+        futures = [self.submit(html) for html in htmls]
+        return [
+            RenderedInvoice(pdf=pdf, render_seconds=seconds)
+            for pdf, seconds in (future.result(timeout=self.timeout) for future in futures)
+        ]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+_renderer: Optional[InvoiceRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_invoice_renderer() -> InvoiceRenderer:
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = InvoiceRenderer()
+        return _renderer
+
+
+def shutdown_invoice_renderer() -> None:
+    with _renderer_lock:
+        if _renderer is not None:
+            _renderer.shutdown()
+
+
+def render_invoice(html: str) -> bytes:
+    rendered = get_invoice_renderer().render(html)
+    logger.info(f"Rendered invoice in {rendered.render_seconds * 1000:.0f}ms")
+    return rendered.pdf
+
+
+def benchmark_invoice_rendering(count: int = 20, workers: Optional[int] = None) -> dict:
+    """
+    Render `count` copies of the order invoice template one after another in
+    this process, then as one batch through the pool. Returns invoices per
+    second for both and the mean per-invoice render time in the pool.
+    """
+    from app.services.template_service import render_order_html
+
+    html = render_order_html(
+        {
+            "txn_id": "bench",
+            "user": {"id": 1, "username": "bench", "phone": "9999999999"},
+            "shipping_address": {"full_name": "Bench User", "user_email": "bench@example.com"},
+            "products": [],
+            "order_status": [],
+            "total_amount": "100.00",
+            "amount": "100.00",
+            "shipping_fee": "0.00",
+            "paid_amount": "100.00",
+            "subtotal": "100.00",
+            "c_gst": "0.00",
+            "s_gst": "0.00",
+        }
+    )
+
+    started = time.perf_counter()
+    for _ in range(count):
+        render_invoice_pdf(html)
+    serial = count / (time.perf_counter() - started)
+
+    renderer = InvoiceRenderer(
+        workers=workers or settings.INVOICE_RENDER_WORKERS, queue_depth=count
+    )
+    try:
+        renderer.render_batch([html])  # start the pool outside the timing
+        started = time.perf_counter()
+        rendered = renderer.render_batch([html] * count)
+        pooled = count / (time.perf_counter() - started)
+    finally:
+        renderer.shutdown()
+    return {
+        "serial_per_second": serial,
+        "pooled_per_second": pooled,
+        "mean_render_ms": 1000 * sum(item.render_seconds for item in rendered) / count,
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.services.invoice_service
+    result = benchmark_invoice_rendering()
+    print(
+        f"serial {result['serial_per_second']:.1f}/s, "
+        f"pooled {result['pooled_per_second']:.1f}/s, "
+        f"{result['mean_render_ms']:.0f}ms per invoice"
+    )
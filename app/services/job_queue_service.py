@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.jobs import Jobs
+
+
+# ----------------------------------------durable job queue---------------------------------
+# Jobs are rows in the jobs table, so work queued with an order commits or
+# rolls back with it and survives restarts. `python -m app.worker` drains it.
+
+PENDING = "pending"
+RUNNING = "running"
+DEAD = "dead"
+
+# job kinds, handled in app.worker
+# renders the order HTML once, then queues the email and invoice jobs
+ORDER_DOCUMENTS = "order_documents"
+ORDER_EMAIL = "order_email"
+ORDER_INVOICE = "order_invoice"
+SIMILAR_PRODUCTS = "similar_products"
+
+
+@dataclass(frozen=True)
+class ClaimedJob:
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    payload: Dict[str, Any],
+    run_at: Optional[datetime] = None,
+    max_attempts: Optional[int] = None,
+) -> Jobs:
+    # added to the caller's transaction; committed by the caller
+    job = Jobs(
+        kind=kind,
+        payload=payload,
+        status=PENDING,
+        run_at=run_at or datetime.utcnow(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    return job
+
+
+def claim_jobs(db: Session, worker_id: str, limit: int = 1) -> List[ClaimedJob]:
+    """
+    Lease up to `limit` due jobs to `worker_id` for
+    JOB_VISIBILITY_TIMEOUT_SECONDS. A single UPDATE .. RETURNING takes the
+    SQLite write lock, so two workers never lease the same job. Jobs whose
+    lease ran out (a worker died mid-job) are due again.
+    """
+    now = datetime.utcnow()
+    due = (
+        select(Jobs.id)
+        .where(
+            or_(
+                and_(Jobs.status == PENDING, Jobs.run_at <= now),
+                and_(Jobs.status == RUNNING, Jobs.locked_until < now),
+            )
+        )
+        .order_by(Jobs.run_at, Jobs.id)
+        .limit(limit)
+    )
+    rows = db.execute(
+        update(Jobs)
+        .where(Jobs.id.in_(due))
+        .values(
+            status=RUNNING,
+            locked_by=worker_id,
+            locked_until=now
+            + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS),
+            # counted on claim, so a job that kills its worker still dies out
+            attempts=Jobs.attempts + 1,
+            updated_at=now,
+        )
+        .returning(
+            Jobs.id, Jobs.kind, Jobs.payload, Jobs.attempts, Jobs.max_attempts
+        )
+    ).all()
+    db.commit()
+    return [
+        ClaimedJob(
+            id=row.id,
+            kind=row.kind,
+            payload=row.payload or {},
+            attempts=row.attempts,
+            max_attempts=row.max_attempts,
+        )
+        for row in rows
+    ]
+
+
+def complete_job(db: Session, job: ClaimedJob, worker_id: str) -> None:
+    # finished jobs are deleted; only a live lease may finish a job
+    db.query(Jobs).filter(
+        Jobs.id == job.id, Jobs.status == RUNNING, Jobs.locked_by == worker_id
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(
+        settings.JOB_BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0),
+        settings.JOB_BACKOFF_MAX_SECONDS,
+    )
+
+
+def fail_job(db: Session, job: ClaimedJob, worker_id: str, error: str) -> str:
+    """Schedule a retry with exponential backoff, or dead-letter the job."""
+    now = datetime.utcnow()
+    if job.attempts >= job.max_attempts:
+        status, run_at = DEAD, now
+    else:
+        status, run_at = PENDING, now + timedelta(seconds=backoff_seconds(job.attempts))
+    db.query(Jobs).filter(
+        Jobs.id == job.id, Jobs.status == RUNNING, Jobs.locked_by == worker_id
+    ).update(
+        {
+            Jobs.status: status,
+            Jobs.run_at: run_at,
+            Jobs.locked_by: None,
+            Jobs.locked_until: None,
+            Jobs.error: error[:2000],
+            Jobs.updated_at: now,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return status
+
+
+def requeue_dead_jobs(db: Session, kind: Optional[str] = None) -> int:
+    # give dead-lettered jobs a fresh set of attempts, e.g. after an SMTP outage
+    query = db.query(Jobs).filter(Jobs.status == DEAD)
+    if kind:
+        query = query.filter(Jobs.kind == kind)
+    requeued = query.update(
+        {
+            Jobs.status: PENDING,
+            Jobs.attempts: 0,
+            Jobs.run_at: datetime.utcnow(),
+            Jobs.updated_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return requeued
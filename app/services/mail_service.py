@@ -0,0 +1,316 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import List, Optional, Set, Tuple
+
+import aiosmtplib
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.mail_conf import mail_conf
+
+
+# ----------------------------------------pooled smtp delivery---------------------------------
+# Messages are queued and sent by MAIL_POOL_SIZE senders, each holding one
+# authenticated SMTP connection. A sender takes up to MAIL_BATCH_SIZE queued
+# messages at a time and reconnects after MAIL_MESSAGES_PER_CONNECTION
+# messages, as office365 throttles long sessions. Dropped connections and
+# 4xx replies are retried with backoff; 5xx replies fail the message.
+
+
+class MailDeliveryError(Exception):
+    pass
+
+
+def build_message(
+    to: str, subject: str, html: str, sender: Optional[str] = None
+) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender or mail_conf.MAIL_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(html, subtype="html")
+    return message
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return isinstance(
+        error,
+        (
+            aiosmtplib.SMTPServerDisconnected,
+            aiosmtplib.SMTPConnectError,
+            aiosmtplib.SMTPTimeoutError,
+            ConnectionError,
+            asyncio.TimeoutError,
+        ),
+    )
+
+
+@dataclass
+class MailStats:
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    connections: int = 0
+    started_at: Optional[float] = None
+    last_sent_at: Optional[float] = None
+
+    def messages_per_second(self) -> float:
+        # across all senders, from the first queued message to the last sent
+        if self.started_at is None or self.last_sent_at is None:
+            return 0.0
+        elapsed = self.last_sent_at - self.started_at
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+
+class MailDispatcher:
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: bool = False,
+        validate_certs: bool = True,
+        pool_size: int = settings.MAIL_POOL_SIZE,
+        batch_size: int = settings.MAIL_BATCH_SIZE,
+        messages_per_connection: int = settings.MAIL_MESSAGES_PER_CONNECTION,
+        max_retries: int = settings.MAIL_MAX_RETRIES,
+        backoff: float = settings.MAIL_RETRY_BACKOFF_SECONDS,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.validate_certs = validate_certs
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.messages_per_connection = messages_per_connection
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = MailStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._senders: List[asyncio.Task] = []
+        # futures of send() calls still waiting, failed by close()
+        self._waiting: Set[asyncio.Future] = set()
+
+    def start(self) -> None:
+        # needs a running loop; called on first send
+        if self._senders:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.MAIL_QUEUE_SIZE)
+        self._senders = [
+            asyncio.create_task(self._sender(slot)) for slot in range(self.pool_size)
+        ]
+
+    async def send(self, message: EmailMessage) -> None:
+        """Queue `message` and wait until it is delivered or has failed."""
+        self.start()
+        if self.stats.started_at is None:
+            self.stats.started_at = time.perf_counter()
+        delivered: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiting.add(delivered)
+        try:
+            await self._queue.put((message, delivered))
+            await delivered
+        finally:
+            self._waiting.discard(delivered)
+
+    async def send_many(
+        self, messages: List[EmailMessage]
+    ) -> List[Optional[Exception]]:
+        results = await asyncio.gather(
+            *(self.send(message) for message in messages), return_exceptions=True
+        )
+        return [result if isinstance(result, Exception) else None for result in results]
+
+    async def close(self) -> None:
+        # lets queued messages go out, then logs out of every connection. With
+        # no live sender the queue would never drain, and a stuck one gets
+        # MAIL_TIMEOUT_SECONDS; messages still undelivered then fail.
+        alive = any(not sender.done() for sender in self._senders)
+        if self._queue is not None and alive:
+            try:
+                await asyncio.wait_for(
+                    self._queue.join(), timeout=settings.MAIL_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Mail queue not drained after {settings.MAIL_TIMEOUT_SECONDS}s"
+                )
+        for sender in self._senders:
+            sender.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        self._senders = []
+        self._queue = None
+        for delivered in self._waiting:
+            if not delivered.done():
+                delivered.set_exception(MailDeliveryError("Mail dispatcher closed"))
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            validate_certs=self.validate_certs,
+            timeout=settings.MAIL_TIMEOUT_SECONDS,
+        )
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+        self.stats.connections += 1
+        return smtp
+
+    @staticmethod
+    async def _disconnect(smtp: Optional[aiosmtplib.SMTP]) -> None:
+        if smtp is None or not smtp.is_connected:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _next_batch(self) -> List[Tuple[EmailMessage, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _deliver(
+        self, smtp: Optional[aiosmtplib.SMTP], sent: int, message: EmailMessage
+    ) -> Tuple[Optional[aiosmtplib.SMTP], int]:
+        """Send one message, reconnecting as needed. Returns the connection state."""
+        attempt = 0
+        while True:
+            try:
+                if smtp is None or not smtp.is_connected or (
+                    sent >= self.messages_per_connection
+                ):
+                    await self._disconnect(smtp)
+                    smtp, sent = await self._connect(), 0
+                await smtp.send_message(message)
+                return smtp, sent + 1
+            except Exception as error:
+                attempt += 1
+                if not _is_transient(error) or attempt > self.max_retries:
+                    raise
+                self.stats.retries += 1
+                await self._disconnect(smtp)
+                smtp = None
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+    async def _sender(self, slot: int) -> None:
+        smtp: Optional[aiosmtplib.SMTP] = None
+        sent = 0
+        try:
+            while True:
+                for message, delivered in await self._next_batch():
+                    try:
+                        smtp, sent = await self._deliver(smtp, sent, message)
+                        self.stats.sent += 1
+                        self.stats.last_sent_at = time.perf_counter()
+                        if not delivered.done():
+                            delivered.set_result(None)
+                    except Exception as error:
+                        self.stats.failed += 1
+                        logger.error(f"Mail to {message['To']} failed: {error}")
+                        if smtp is not None and not smtp.is_connected:
+                            smtp = None
+                        if not delivered.done():
+                            delivered.set_exception(MailDeliveryError(str(error)))
+                    finally:
+                        self._queue.task_done()
+        finally:
+            await self._disconnect(smtp)
+
+
+_dispatcher: Optional[MailDispatcher] = None
+
+
+def get_mail_dispatcher() -> MailDispatcher:
+    global _dispatcher
+    if _dispatcher is None and settings.MAIL_STAND_IN:
+        # plain SMTP without auth, e.g. python -m aiosmtpd -n -l localhost:8025
+        host, _, port = settings.MAIL_STAND_IN.partition(":")
+        _dispatcher = MailDispatcher(hostname=host, port=int(port or 25))
+    if _dispatcher is None:
+        _dispatcher = MailDispatcher(
+            hostname=mail_conf.MAIL_SERVER,
+            port=mail_conf.MAIL_PORT,
+            username=mail_conf.MAIL_USERNAME if mail_conf.USE_CREDENTIALS else None,
+            password=mail_conf.MAIL_PASSWORD.get_secret_value(),
+            use_tls=mail_conf.MAIL_SSL_TLS,
+            start_tls=mail_conf.MAIL_STARTTLS,
+            validate_certs=mail_conf.VALIDATE_CERTS,
+        )
+    return _dispatcher
+
+
+async def close_mail_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.close()
+        logger.info(
+            f"Mail dispatcher sent {_dispatcher.stats.sent} messages at "
+            f"{_dispatcher.stats.messages_per_second():.1f}/s"
+        )
+        _dispatcher = None
+
+
+async def benchmark_mail_dispatch(messages: int = 200) -> dict:
+    """
+    Deliver `messages` to a local aiosmtpd sink, first with a new SMTP
+    session per message (the old FastMail behaviour), then through a
+    MailDispatcher. Returns messages per second for both. Needs aiosmtpd.
+    """
+    import socket
+
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.handlers import Sink
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        host, port = probe.getsockname()
+    controller = Controller(Sink(), hostname=host, port=port)
+    controller.start()
+    try:
+        batch = [
+            build_message(
+                "bench@example.com",
+                f"bench {number}",
+                "<p>bench</p>",
+                sender="shop@example.com",
+            )
+            for number in range(messages)
+        ]
+
+        started = time.perf_counter()
+        for message in batch:
+            await aiosmtplib.send(message, hostname=host, port=port, start_tls=False)
+        per_message = messages / (time.perf_counter() - started)
+
+        dispatcher = MailDispatcher(hostname=host, port=port)
+        started = time.perf_counter()
+        failures = await dispatcher.send_many(batch)
+        pooled = messages / (time.perf_counter() - started)
+        await dispatcher.close()
+    finally:
+        controller.stop()
+    return {
+        "per_message_session_per_second": per_message,
+        "pooled_per_second": pooled,
+        "connections": dispatcher.stats.connections,
+        "failed": sum(failure is not None for failure in failures),
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.services.mail_service
+    print(asyncio.run(benchmark_mail_dispatch()))
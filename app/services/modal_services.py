@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Type, TypeVar, List, Optional, Dict, Any
 from app.schemas.response import MessageResponse
 from sqlalchemy.orm import Session
@@ -81,6 +82,8 @@ def update_record(
         for key, value in updates.items():
             if hasattr(record, key) and value is not None:
                 setattr(record, key, value)
+        if hasattr(record, "updated_at"):
+            record.updated_at = datetime.utcnow()
 
         # Commit changes to the database
         db.commit()
@@ -0,0 +1,94 @@
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.db.models.orders import Order_documents, Orders
+from app.services.job_queue_service import ORDER_EMAIL, ORDER_INVOICE, enqueue_job
+from app.services.order_summary_service import get_order_summary
+from app.services.template_service import get_render_stats, render_order_html
+
+
+# ----------------------------------------order documents---------------------------------
+# The confirmation HTML of an order is rendered once, by the ORDER_DOCUMENTS
+# job, and stored in order_documents. The same commit queues the email and
+# invoice jobs, which read the stored HTML, so neither renders it and each
+# still retries on its own.
+
+
+def _render(db: Session, txn_id: str) -> Dict[str, Any]:
+    order = db.query(Orders.id).filter(Orders.txn_id == txn_id).first()
+    document = get_order_summary(db, txn_id)
+    if order is None or document is None:
+        raise ValueError(f"No order for txn_id {txn_id}")
+    started = time.perf_counter()
+    html = render_order_html(document)
+    now = datetime.utcnow()
+    return {
+        "order_id": order.id,
+        "txn_id": txn_id,
+        "html": html,
+        "render_ms": 1000 * (time.perf_counter() - started),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def render_order_documents(db: Session, txn_id: str, email_to: str) -> bool:
+    """
+    Render and store the order's HTML and queue its email and invoice jobs,
+    in one commit. Returns False if an earlier run already did.
+    """
+    exists = (
+        db.query(Order_documents.id).filter(Order_documents.txn_id == txn_id).first()
+    )
+    if exists is not None:
+        return False
+    try:
+        # a plain insert: a concurrent run fails on the unique txn_id instead
+        # of queueing a second email
+        db.add(Order_documents(**_render(db, txn_id)))
+        enqueue_job(db, ORDER_EMAIL, {"txn_id": txn_id, "email_to": email_to})
+        enqueue_job(db, ORDER_INVOICE, {"txn_id": txn_id})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return True
+
+
+def get_order_html(db: Session, txn_id: str) -> str:
+    html = (
+        db.query(Order_documents.html).filter(Order_documents.txn_id == txn_id).scalar()
+    )
+    if html is not None:
+        return html
+    # email and invoice jobs queued before order documents existed
+    values = _render(db, txn_id)
+    db.execute(
+        insert(Order_documents)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[Order_documents.txn_id])
+    )
+    db.commit()
+    return values["html"]
+
+
+def get_order_document_stats(db: Session) -> Dict[str, Any]:
+    """Render times of every stored order document, plus this process's renders."""
+    row = db.query(
+        func.count(Order_documents.id).label("documents"),
+        func.avg(Order_documents.render_ms).label("mean_ms"),
+        func.max(Order_documents.render_ms).label("max_ms"),
+        func.max(Order_documents.created_at).label("last_rendered_at"),
+    ).one()
+    return {
+        "documents": row.documents,
+        "mean_render_ms": row.mean_ms or 0.0,
+        "max_render_ms": row.max_ms or 0.0,
+        "last_rendered_at": row.last_rendered_at,
+        "process": get_render_stats(),
+    }
@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from app.db.models.carts import Carts
+from app.db.models.orders import (
+    Order_details,
+    Orders,
+    Orders_status,
+    Payment_details,
+    order_selected_tags,
+)
+from app.db.models.user import User, User_shipping_address
+from app.schemas.request import OrderCreatePayload
+from app.services.cart_service import load_cart_details
+from app.services.job_queue_service import (
+    ORDER_DOCUMENTS,
+    SIMILAR_PRODUCTS,
+    enqueue_job,
+)
+from app.services.order_summary_service import (
+    build_order_summary,
+    format_order_products,
+    format_order_status,
+    save_order_summary,
+)
+from app.services.pricing_service import get_pricing_snapshot, price_cart
+
+
+# ----------------------------------------order placement---------------------------------
+
+
+class EmptyCartError(ValueError):
+    pass
+
+
+class PaymentAmountMismatch(ValueError):
+    pass
+
+
+@dataclass
+class PlacedOrder:
+    order: Orders
+    quote: Dict[str, Any]
+    # the stored order summary document, see order_summary_service
+    summary: Dict[str, Any]
+
+
+def _order_line(cart: Carts, user_id: int, order_id: int, now: datetime) -> Dict:
+    return {
+        "user_id": user_id,
+        "product_id": cart.product_id,
+        "order_id": order_id,
+        "quantity": 1,
+        "certificate_color": cart.certificate_color or "",
+        "frame_color": cart.frame_color or "",
+        "frame_size": cart.frame_size or "",
+        "frame_thickness": cart.frame_thickness or "",
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def place_order(
+    db: Session,
+    session_id: str,
+    payload: OrderCreatePayload,
+    payment_detail: Dict[str, Any],
+) -> PlacedOrder:
+    """
+    Turn the session's cart into an order in one transaction: user, shipping
+    address, order, order lines, selected tags, payment and status are
+    flushed together and committed once, or rolled back together. Amounts
+    come from the server-side cart quote, never from the client payload.
+    """
+    try:
+        # priced from a fresh read, not the cart cache
+        quote = price_cart(get_pricing_snapshot(db), load_cart_details(db, session_id))
+        paid_amount = float(payment_detail.get("payment_amount") or 0)
+        if paid_amount + 0.01 < quote["total_amount"]:
+            raise PaymentAmountMismatch(
+                f"Paid amount {paid_amount} is less than cart total "
+                f"{quote['total_amount']}"
+            )
+
+        carts = (
+            db.query(Carts)
+            .filter(Carts.session_id == session_id)
+            .order_by(Carts.id)
+            .all()
+        )
+        if not carts:
+            raise EmptyCartError("No cart items found for session")
+        cart_ids = [cart.id for cart in carts]
+
+        # 1. Get or create user
+        user = db.query(User).filter(User.phone == payload.phone).first()
+        if not user:
+            user = User(
+                username=payload.username,
+                phone=payload.phone,
+                email=payload.email,
+                password=payload.phone,
+                status="active",
+            )
+            db.add(user)
+            db.flush()
+
+        # 2. Create user shipping address
+        shipping = User_shipping_address(
+            user_email=payload.user_email,
+            user_fname=payload.user_fname,
+            user_lname=payload.user_lname,
+            user_address=payload.user_address,
+            city=payload.city,
+            landmark=payload.landmark,
+            state=payload.state,
+            pincode=payload.pincode,
+            country=payload.country,
+            contact_mobile=payload.contact_mobile,
+            user_id=user.id,
+        )
+        db.add(shipping)
+        db.flush()
+
+        # 3. Create main order
+        gst = {
+            key: quote[key]
+            for key in ("subtotal", "cgst", "sgst", "cgst_rate", "sgst_rate")
+        }
+        order = Orders(
+            user_id=user.id,
+            total_amount=quote["total_amount"],
+            shipping_fee=quote["shipping_fee"],
+            shipping_address=shipping.id,
+            sub_total=quote["subtotal"],
+            c_gst=quote["cgst"],
+            s_gst=quote["sgst"],
+            paid_amount=paid_amount,
+            txn_id=payment_detail["order_id"],
+        )
+        db.add(order)
+        db.flush()
+
+        # 4. Order lines in one bulk insert
+        now = datetime.utcnow()
+        lines = [_order_line(cart, user.id, order.id, now) for cart in carts]
+        db.bulk_insert_mappings(Order_details, lines)
+
+        # 5. Move the selected tags from the cart lines to the order
+        db.query(order_selected_tags).filter(
+            order_selected_tags.cart_id.in_(cart_ids)
+        ).update(
+            {
+                order_selected_tags.cart_id: None,
+                order_selected_tags.order_id: order.id,
+                order_selected_tags.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+
+        # 6. Payment record and first status
+        db.add(
+            Payment_details(
+                order_id=order.id,
+                user_id=user.id,
+                payment_id=payment_detail["cf_payment_id"],
+                payment_amount=payment_detail["payment_amount"],
+                payment_status=payment_detail["payment_status"],
+                payment_response=payment_detail,
+            )
+        )
+        db.add(
+            Orders_status(order_status="Processing", order_id=order.id, user_id=user.id)
+        )
+
+        # 7. Canonical order document for tracking, email and invoice
+        product_details = format_order_products(db, carts)
+        payment_method = next(iter(payment_detail.get("payment_method") or {}), None)
+        summary = build_order_summary(
+            order,
+            user,
+            shipping,
+            product_details,
+            [format_order_status("Processing", now)],
+            gst,
+            payment_method,
+        )
+        save_order_summary(db, order, summary)
+
+        # 8. Email and invoice (through the order documents job) and similar
+        # products, queued in the same commit so an order never loses its
+        # follow-up work
+        enqueue_job(
+            db, ORDER_DOCUMENTS, {"txn_id": order.txn_id, "email_to": payload.email}
+        )
+        enqueue_job(
+            db,
+            SIMILAR_PRODUCTS,
+            {"product_ids": [detail["product_id"] for detail in product_details]},
+        )
+
+        # 9. Empty the cart
+        db.query(Carts).filter(Carts.id.in_(cart_ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return PlacedOrder(order=order, quote=quote, summary=summary)
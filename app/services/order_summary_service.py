@@ -0,0 +1,231 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+
+from app.core.config import settings
+from app.db.models.orders import (
+    Order_details,
+    Order_summaries,
+    Orders,
+    Orders_status,
+    Payment_details,
+)
+from app.db.models.product import Products
+from app.db.models.user import User, User_shipping_address
+from app.services.storage_service import get_invoice_storage, get_media_storage
+from app.utils.helpers import format_amount
+
+
+# ----------------------------------------order summary documents---------------------------------
+
+
+def format_order_status(title: str, created_at: datetime) -> Dict[str, str]:
+    return {"title": title, "description": created_at.strftime("%d/%m/%Y")}
+
+
+def format_order_products(
+    db: Session, order_lines: List[Any]
+) -> List[Dict[str, Any]]:
+    # order_lines need product_id, certificate_color and frame_color
+    products = {
+        product.id: product
+        for product in db.query(
+            Products.id,
+            Products.product_name,
+            Products.price,
+            Products.is_digital,
+            Products.thumbnail,
+        ).filter(Products.id.in_({line.product_id for line in order_lines}))
+    }
+    media = get_media_storage()
+    result = []
+    for line in order_lines:
+        product = products.get(line.product_id)
+        if product is None:
+            continue
+        result.append(
+            {
+                "product_id": product.id,
+                "product_name": product.product_name,
+                "price": format_amount(product.price),
+                "is_digital": product.is_digital,
+                "thumbnail": product.thumbnail,
+                "thumbnail_url": (
+                    media.url(product.thumbnail) if product.thumbnail else None
+                ),
+                "certificate_color": line.certificate_color or "",
+                "frame_color": line.frame_color or "",
+            }
+        )
+    return result
+
+
+def build_order_summary(
+    order: Orders,
+    user: User,
+    shipping: User_shipping_address,
+    products: List[Dict[str, Any]],
+    order_statuses: List[Dict[str, str]],
+    gst_rates: Dict[str, Any],
+    payment_method: Optional[str] = None,
+) -> Dict[str, Any]:
+    """The one order document read by tracking, confirmation emails and invoices."""
+    total_amount = float(order.total_amount or 0)
+    shipping_fee = float(order.shipping_fee or 0)
+    return {
+        "txn_id": order.txn_id,
+        "user": {
+            "id": user.id,
+            "username": user.username,
+            "phone": user.phone,
+        },
+        "shipping_address": {
+            "user_email": shipping.user_email,
+            "full_name": f"{shipping.user_fname} {shipping.user_lname}",
+            "user_fname": shipping.user_fname,
+            "user_lname": shipping.user_lname,
+            "user_address": shipping.user_address,
+            "city": shipping.city,
+            "state": shipping.state,
+            "pincode": shipping.pincode,
+            "country": shipping.country,
+            "contact_mobile": shipping.contact_mobile,
+        },
+        "products": products,
+        "order_status": order_statuses,
+        "total_amount": format_amount(total_amount),
+        "amount": format_amount(total_amount - shipping_fee),
+        "shipping_fee": format_amount(shipping_fee),
+        "paid_amount": format_amount(order.paid_amount),
+        "subtotal": format_amount(order.sub_total),
+        "c_gst": format_amount(order.c_gst),
+        "s_gst": format_amount(order.s_gst),
+        "cgst_rate": gst_rates.get("cgst_rate", 0),
+        "sgst_rate": gst_rates.get("sgst_rate", 0),
+        "WEB_URL": settings.WEB_URL + order.txn_id,
+        "payment_methods": payment_method,
+        # a storage key; get_order_summary turns it into invoice_url
+        "invoice_key": order.invoice,
+    }
+
+
+def save_order_summary(db: Session, order: Orders, document: Dict[str, Any]) -> None:
+    # added to the caller's transaction; committed by the caller
+    db.add(Order_summaries(order_id=order.id, txn_id=order.txn_id, document=document))
+
+
+def _update_document(db: Session, order_filter, **changes) -> None:
+    summary = db.query(Order_summaries).filter(order_filter).first()
+    if summary is None:
+        return
+    document = dict(summary.document or {})
+    for key, change in changes.items():
+        document[key] = change(document.get(key))
+    summary.document = document
+    summary.updated_at = datetime.utcnow()
+    flag_modified(summary, "document")
+
+
+def append_order_status(
+    db: Session, order_id: int, title: str, created_at: Optional[datetime] = None
+) -> None:
+    entry = format_order_status(title, created_at or datetime.utcnow())
+    _update_document(
+        db,
+        Order_summaries.order_id == order_id,
+        order_status=lambda statuses: list(statuses or []) + [entry],
+    )
+
+
+def set_order_invoice(db: Session, txn_id: str, invoice_key: str) -> None:
+    _update_document(
+        db, Order_summaries.txn_id == txn_id, invoice_key=lambda _: invoice_key
+    )
+
+
+def get_invoice_url(invoice: Optional[str]) -> Optional[str]:
+    """
+    URL for an invoice stored as a storage key in Orders.invoice. Signed on
+    every read when invoice URLs are presigned, so it never goes stale.
+    """
+    if not invoice:
+        return None
+    if invoice.startswith(("http://", "https://")):
+        # orders whose invoice URL was stored before keys were
+        return invoice
+    return get_invoice_storage().url(invoice)
+
+
+def _with_invoice_url(document: Dict[str, Any]) -> Dict[str, Any]:
+    document = dict(document)
+    document["invoice_url"] = get_invoice_url(
+        document.pop("invoice_key", None) or document.get("invoice_url")
+    )
+    return document
+
+
+def build_order_summary_from_db(db: Session, order: Orders) -> Dict[str, Any]:
+    # orders placed before summaries existed
+    user = db.query(User).filter(User.id == order.user_id).first()
+    shipping = (
+        db.query(User_shipping_address)
+        .filter(User_shipping_address.id == order.shipping_address)
+        .first()
+    )
+    order_lines = (
+        db.query(Order_details)
+        .filter(Order_details.order_id == order.id)
+        .order_by(Order_details.id)
+        .all()
+    )
+    statuses = (
+        db.query(Orders_status)
+        .filter(Orders_status.order_id == order.id)
+        .order_by(Orders_status.id)
+        .all()
+    )
+    payment = (
+        db.query(Payment_details)
+        .filter(Payment_details.order_id == order.id)
+        .order_by(Payment_details.id)
+        .first()
+    )
+    payment_method = None
+    if payment and isinstance(payment.payment_response, dict):
+        payment_method = next(
+            iter(payment.payment_response.get("payment_method") or {}), None
+        )
+    return build_order_summary(
+        order,
+        user,
+        shipping,
+        format_order_products(db, order_lines),
+        [format_order_status(item.order_status, item.created_at) for item in statuses],
+        {},
+        payment_method,
+    )
+
+
+def get_order_summary(db: Session, txn_id: str) -> Optional[Dict[str, Any]]:
+    """
+    One indexed lookup by txn_id. Legacy orders without a summary get one
+    built and stored on first read. The stored invoice key is returned as a
+    fresh invoice_url.
+    """
+    summary = db.query(Order_summaries).filter(Order_summaries.txn_id == txn_id).first()
+    if summary is not None:
+        return _with_invoice_url(summary.document or {})
+
+    order = db.query(Orders).filter(Orders.txn_id == txn_id).first()
+    if order is None:
+        return None
+    document = build_order_summary_from_db(db, order)
+    try:
+        save_order_summary(db, order, document)
+        db.commit()
+    except Exception:
+        # a concurrent read stored it first
+        db.rollback()
+    return _with_invoice_url(document)
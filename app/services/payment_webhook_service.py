@@ -0,0 +1,263 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.models.orders import (
+    Orders,
+    Orders_status,
+    Payment_details,
+    Payment_webhook_events,
+)
+from app.db.session import SessionLocal
+from app.services.order_summary_service import append_order_status
+
+
+# ----------------------------------------cashfree payment webhooks---------------------------------
+
+PENDING = "pending"
+PROCESSING = "processing"
+PROCESSED = "processed"
+IGNORED = "ignored"
+FAILED = "failed"
+
+PAYMENT_SUCCESS = "PAYMENT_SUCCESS_WEBHOOK"
+
+# webhook type -> order status recorded for it
+ORDER_STATUS_BY_EVENT = {
+    PAYMENT_SUCCESS: "Processing",
+    "PAYMENT_FAILED_WEBHOOK": "Payment Failed",
+    "PAYMENT_USER_DROPPED_WEBHOOK": "Payment Cancelled",
+}
+
+
+class InvalidWebhookSignature(Exception):
+    pass
+
+
+class OrderNotPlacedYet(Exception):
+    pass
+
+
+_wakeup: Optional[asyncio.Event] = None
+
+
+def verify_webhook_signature(raw_body: bytes, timestamp: str, signature: str) -> None:
+    """
+    Cashfree signs base64(HMAC-SHA256(timestamp + raw body)) with the client
+    secret. Stale timestamps are rejected to stop replays.
+    """
+    if not timestamp or not signature:
+        raise InvalidWebhookSignature("Missing webhook signature headers")
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        raise InvalidWebhookSignature("Invalid webhook timestamp")
+    if sent_at > 10**12:  # milliseconds
+        sent_at //= 1000
+    if abs(time.time() - sent_at) > settings.CASHFREE_WEBHOOK_TOLERANCE_SECONDS:
+        raise InvalidWebhookSignature("Webhook timestamp outside tolerance")
+
+    digest = hmac.new(
+        settings.CASHFREE_CLIENT_SECRET.encode(),
+        timestamp.encode() + raw_body,
+        hashlib.sha256,
+    ).digest()
+    if not hmac.compare_digest(base64.b64encode(digest).decode(), signature):
+        raise InvalidWebhookSignature("Invalid webhook signature")
+
+
+def store_webhook_event(db: Session, raw_body: bytes) -> None:
+    # only what is needed for routing is parsed here; the consumer does the rest
+    event = json.loads(raw_body)
+    data = event.get("data") or {}
+    now = datetime.utcnow()
+    db.execute(
+        insert(Payment_webhook_events)
+        .values(
+            payload_hash=hashlib.sha256(raw_body).hexdigest(),
+            event_type=event.get("type"),
+            txn_id=(data.get("order") or {}).get("order_id"),
+            payment_id=str((data.get("payment") or {}).get("cf_payment_id") or ""),
+            raw_body=raw_body.decode(),
+            status=PENDING,
+            attempts=0,
+            next_attempt_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        .on_conflict_do_nothing(index_elements=[Payment_webhook_events.payload_hash])
+    )
+    db.commit()
+
+
+def _apply_payment(db: Session, event: Payment_webhook_events) -> str:
+    if event.event_type not in ORDER_STATUS_BY_EVENT:
+        return IGNORED
+    order = db.query(Orders).filter(Orders.txn_id == event.txn_id).first()
+    if order is None:
+        if event.event_type != PAYMENT_SUCCESS:
+            # failed and abandoned payments never become orders
+            return IGNORED
+        # the webhook can beat /product/verify/order/; retry later
+        raise OrderNotPlacedYet(f"No order for txn_id {event.txn_id}")
+
+    payment = json.loads(event.raw_body)["data"].get("payment") or {}
+    payment_row = (
+        db.query(Payment_details)
+        .filter(
+            Payment_details.order_id == order.id,
+            Payment_details.payment_id == event.payment_id,
+        )
+        .first()
+    )
+    if payment_row is None:
+        payment_row = Payment_details(
+            order_id=order.id, user_id=order.user_id, payment_id=event.payment_id
+        )
+        db.add(payment_row)
+    payment_row.payment_amount = payment.get("payment_amount")
+    payment_row.payment_status = payment.get("payment_status")
+    payment_row.payment_response = payment
+    payment_row.updated_at = datetime.utcnow()
+
+    order_status = ORDER_STATUS_BY_EVENT[event.event_type]
+    latest = (
+        db.query(Orders_status.order_status)
+        .filter(Orders_status.order_id == order.id)
+        .order_by(Orders_status.id.desc())
+        .first()
+    )
+    if latest is None or latest.order_status != order_status:
+        db.add(
+            Orders_status(
+                order_status=order_status, order_id=order.id, user_id=order.user_id
+            )
+        )
+        append_order_status(db, order.id, order_status)
+    return PROCESSED
+
+
+def claim_webhook_events(db: Session, limit: int = 50) -> List[Tuple[int, int]]:
+    """
+    Lease up to `limit` due events for CASHFREE_WEBHOOK_LEASE_SECONDS, in one
+    UPDATE .. RETURNING like job_queue_service.claim_jobs, so web workers
+    running the consumer side by side never apply the same event. Returns
+    (id, attempts) pairs; the attempt count identifies this claim when the
+    result is written back.
+    """
+    now = datetime.utcnow()
+    events = Payment_webhook_events
+    due = (
+        select(events.id)
+        .where(
+            or_(
+                and_(events.status == PENDING, events.next_attempt_at <= now),
+                # a consumer died holding the lease
+                and_(events.status == PROCESSING, events.next_attempt_at < now),
+            )
+        )
+        .order_by(events.next_attempt_at, events.id)
+        .limit(limit)
+    )
+    rows = db.execute(
+        update(events)
+        .where(events.id.in_(due))
+        .values(
+            status=PROCESSING,
+            next_attempt_at=now
+            + timedelta(seconds=settings.CASHFREE_WEBHOOK_LEASE_SECONDS),
+            attempts=events.attempts + 1,
+            updated_at=now,
+        )
+        .returning(events.id, events.attempts)
+    ).all()
+    db.commit()
+    return sorted((row.id, row.attempts) for row in rows)
+
+
+def _finish_event(db: Session, event_id: int, attempts: int, **values) -> bool:
+    # only while our claim still holds; False if the lease ran out and the
+    # event was claimed again
+    result = db.execute(
+        update(Payment_webhook_events)
+        .where(
+            Payment_webhook_events.id == event_id,
+            Payment_webhook_events.status == PROCESSING,
+            Payment_webhook_events.attempts == attempts,
+        )
+        .values(updated_at=datetime.utcnow(), **values)
+    )
+    return result.rowcount == 1
+
+
+def process_due_webhook_events(limit: int = 50) -> int:
+    """Apply pending events whose next attempt is due. Returns how many ran."""
+    with SessionLocal() as db:
+        claimed = claim_webhook_events(db, limit)
+        for event_id, attempts in claimed:
+            event = db.get(Payment_webhook_events, event_id)
+            try:
+                status = _apply_payment(db, event)
+                # the payment rows and the event status commit together
+                if not _finish_event(db, event_id, attempts, status=status, error=None):
+                    db.rollback()
+                    continue
+            except Exception as error:
+                db.rollback()
+                if attempts >= settings.CASHFREE_WEBHOOK_MAX_ATTEMPTS:
+                    values = {"status": FAILED}
+                    logger.error(f"Webhook event {event_id} failed: {error}")
+                else:
+                    values = {
+                        "status": PENDING,
+                        "next_attempt_at": datetime.utcnow()
+                        + timedelta(
+                            seconds=settings.CASHFREE_WEBHOOK_POLL_SECONDS * attempts
+                        ),
+                    }
+                _finish_event(db, event_id, attempts, error=str(error), **values)
+            # one commit per event, so a failure never undoes earlier ones
+            db.commit()
+        return len(claimed)
+
+
+def notify_webhook_consumer() -> None:
+    # call from the event loop thread
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def run_webhook_consumer() -> None:
+    """
+    Lifespan task: apply stored events as they arrive, and every
+    CASHFREE_WEBHOOK_POLL_SECONDS for retries and events left by a restart.
+    """
+    global _wakeup
+    _wakeup = asyncio.Event()
+    while True:
+        _wakeup.clear()
+        try:
+            processed = await run_in_threadpool(process_due_webhook_events)
+        except Exception as error:
+            logger.error(f"Webhook consumer error: {error}")
+            processed = 0
+        if processed:
+            continue
+        try:
+            await asyncio.wait_for(
+                _wakeup.wait(), timeout=settings.CASHFREE_WEBHOOK_POLL_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,156 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.logger import logger
+from app.db.models.product import Product_shipping_rates
+from app.db.models.user import SettingsModel
+from app.services.cart_service import get_session_cart, load_cart_details
+from app.utils.helpers import get_c_gst_s_gst
+
+
+# ----------------------------------------cart pricing---------------------------------
+
+ACTIVE_RATE_STATUSES = {"1", "true", "active", "approved"}
+
+
+@dataclass(frozen=True)
+class PricingSettings:
+    # attribute names match SettingsModel, as read by get_c_gst_s_gst
+    pricesWithTax: str = "no"
+    pricesWithShipping: str = "no"
+    taxRate: int = 0
+    shippingCharges: int = 0
+
+
+@dataclass(frozen=True)
+class PricingSnapshot:
+    # order in which rebuilds started, so a slow older one never replaces it
+    build: int
+    settings: PricingSettings
+    # (start_price, end_price, shipping_rate), ordered by start_price
+    shipping_rates: Tuple[Tuple[float, float, float], ...]
+
+
+_snapshot: Optional[PricingSnapshot] = None
+_builds_started = 0
+_lock = threading.Lock()
+
+
+def _amount(value: Any) -> float:
+    try:
+        return float(str(value).replace(",", "")) if value not in (None, "") else 0.0
+    except ValueError:
+        return 0.0
+
+
+def rebuild_pricing_snapshot(db: Session) -> PricingSnapshot:
+    global _snapshot, _builds_started
+    # queries run outside the lock (see catalog_service.rebuild_catalog_snapshot)
+    with _lock:
+        _builds_started += 1
+        build = _builds_started
+
+    row = db.query(SettingsModel).first()
+    pricing_settings = (
+        PricingSettings(
+            pricesWithTax=row.pricesWithTax,
+            pricesWithShipping=row.pricesWithShipping,
+            taxRate=row.taxRate or 0,
+            shippingCharges=row.shippingCharges or 0,
+        )
+        if row
+        else PricingSettings()
+    )
+    rates = sorted(
+        (_amount(rate.start_price), _amount(rate.end_price), _amount(rate.shipping_rate))
+        for rate in db.query(Product_shipping_rates).all()
+        if str(rate.status).lower() in ACTIVE_RATE_STATUSES
+    )
+
+    with _lock:
+        if _snapshot is not None and _snapshot.build > build:
+            return _snapshot
+        _snapshot = PricingSnapshot(
+            build=build, settings=pricing_settings, shipping_rates=tuple(rates)
+        )
+        return _snapshot
+
+
+def get_pricing_snapshot(db: Session) -> PricingSnapshot:
+    snapshot = _snapshot
+    if snapshot is None:
+        snapshot = rebuild_pricing_snapshot(db)
+    return snapshot
+
+
+def refresh_pricing(db: Session) -> None:
+    # Called after settings writes; a failed rebuild is retried on next read
+    global _snapshot
+    try:
+        rebuild_pricing_snapshot(db)
+    except Exception as error:
+        logger.error(f"Pricing snapshot rebuild failed: {error}")
+        with _lock:
+            _snapshot = None
+
+
+def shipping_fee(snapshot: PricingSnapshot, physical_total: float) -> float:
+    if physical_total <= 0 or snapshot.settings.pricesWithShipping == "yes":
+        return 0.0
+    for start_price, end_price, rate in snapshot.shipping_rates:
+        if start_price <= physical_total <= end_price:
+            return rate
+    return float(snapshot.settings.shippingCharges or 0)
+
+
+def price_cart(snapshot: PricingSnapshot, lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Line totals, shipping and CGST/SGST for a cart, in one pass over its lines."""
+    items = []
+    items_total = 0.0
+    physical_total = 0.0
+    for line in lines:
+        unit_price = _amount(line["price"])
+        line_total = unit_price  # cart lines are always quantity 1
+        items_total += line_total
+        if not line["is_digital"]:
+            physical_total += line_total
+        items.append(
+            {
+                "cart_id": line["cart_id"],
+                "product_id": line["product_id"],
+                "product_name": line["product_name"],
+                "unit_price": unit_price,
+                "quantity": 1,
+                "line_total": line_total,
+            }
+        )
+
+    shipping = shipping_fee(snapshot, physical_total)
+    gst = get_c_gst_s_gst(items_total, snapshot.settings)
+    return {
+        "items": items,
+        "items_total": round(items_total, 2),
+        "shipping_fee": round(shipping, 2),
+        "subtotal": round(gst["subtotal"], 2),
+        "cgst": round(gst["cgst"], 2),
+        "sgst": round(gst["sgst"], 2),
+        "cgst_rate": gst["cgst_rate"],
+        "sgst_rate": gst["sgst_rate"],
+        "total_amount": round(items_total + shipping, 2),
+    }
+
+
+def quote_cart(db: Session, session_id: str, fresh: bool = False) -> Dict[str, Any]:
+    # cart lines come from the cart cache and settings from the pricing
+    # snapshot, so a warm quote runs no queries. The cache is per process, so
+    # amounts that get charged use `fresh`: the same database read
+    # order_service.place_order prices from.
+    lines = (
+        load_cart_details(db, session_id) if fresh else get_session_cart(db, session_id)
+    )
+    if not lines:
+        raise ValueError("No cart items found for this session")
+    return {"session_id": session_id, **price_cart(get_pricing_snapshot(db), lines)}
@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import REAL, case, cast, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.db.models.product import (
+    Product_rating,
+    Product_rating_summary,
+    Products,
+)
+
+
+# ----------------------------------------product rating aggregates---------------------------------
+
+STARS = range(1, 6)
+COUNTED_STATUS = "approved"
+
+
+def validate_rating(rating: int) -> None:
+    if rating not in STARS:
+        raise ValueError("Rating must be between 1 and 5")
+
+
+def apply_rating_delta(db: Session, product_id: int, rating: int, delta: int) -> None:
+    """
+    Add (delta=1) or remove (delta=-1) one review from the product's summary in
+    a single upsert, so concurrent review writes never lose an update.
+    Commits are left to the caller.
+    """
+    validate_rating(rating)
+    star_column = f"star_{rating}"
+    now = datetime.utcnow()
+    statement = insert(Product_rating_summary).values(
+        product_id=product_id,
+        rating_count=max(delta, 0),
+        rating_sum=max(delta, 0) * rating,
+        rating_avg=float(rating) if delta > 0 else 0.0,
+        created_at=now,
+        updated_at=now,
+        **{f"star_{star}": int(star == rating and delta > 0) for star in STARS},
+    )
+    summary = Product_rating_summary
+    new_count = summary.rating_count + delta
+    new_sum = summary.rating_sum + delta * rating
+    statement = statement.on_conflict_do_update(
+        index_elements=[summary.product_id],
+        set_={
+            "rating_count": new_count,
+            "rating_sum": new_sum,
+            "rating_avg": case(
+                (new_count > 0, cast(new_sum, REAL) / new_count), else_=0.0
+            ),
+            star_column: getattr(summary, star_column) + delta,
+            "updated_at": now,
+        },
+    )
+    db.execute(statement)
+    sync_product_rating_averages(db, product_id)
+
+
+def sync_product_rating_averages(db: Session, product_id: Optional[int] = None) -> None:
+    """
+    Copy rating_avg from the summaries onto Products, which carries the rating
+    sort index. Only the given product is touched when product_id is set.
+    Commits are left to the caller.
+    """
+    average = (
+        select(Product_rating_summary.rating_avg)
+        .where(Product_rating_summary.product_id == Products.id)
+        .scalar_subquery()
+    )
+    statement = update(Products).values(rating_avg=func.coalesce(average, 0.0))
+    if product_id is not None:
+        statement = statement.where(Products.id == product_id)
+    db.execute(statement.execution_options(synchronize_session=False))
+
+
+def rebuild_rating_summaries(db: Session) -> int:
+    """Recompute every summary from Product_rating to reconcile drift."""
+    rows = (
+        db.query(
+            Product_rating.product_id,
+            func.count(Product_rating.id).label("rating_count"),
+            func.coalesce(func.sum(Product_rating.rating), 0).label("rating_sum"),
+            *[
+                func.sum(case((Product_rating.rating == star, 1), else_=0)).label(
+                    f"star_{star}"
+                )
+                for star in STARS
+            ],
+        )
+        .filter(Product_rating.status == COUNTED_STATUS)
+        .group_by(Product_rating.product_id)
+        .all()
+    )
+    try:
+        db.query(Product_rating_summary).delete()
+        now = datetime.utcnow()
+        db.bulk_insert_mappings(
+            Product_rating_summary,
+            [
+                {
+                    "product_id": row.product_id,
+                    "rating_count": row.rating_count,
+                    "rating_sum": row.rating_sum,
+                    "rating_avg": (
+                        row.rating_sum / row.rating_count if row.rating_count else 0.0
+                    ),
+                    **{f"star_{star}": getattr(row, f"star_{star}") for star in STARS},
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for row in rows
+            ],
+        )
+        sync_product_rating_averages(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+
+def serialize_rating_summary(
+    summary: Optional[Product_rating_summary],
+) -> Dict[str, Any]:
+    if summary is None:
+        return {
+            "count": 0,
+            "average": 0.0,
+            "histogram": {str(star): 0 for star in STARS},
+        }
+    return {
+        "count": summary.rating_count,
+        "average": round(summary.rating_avg, 2),
+        "histogram": {str(star): getattr(summary, f"star_{star}") for star in STARS},
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.services.rating_service
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as session:
+        print(f"Rebuilt rating summaries for {rebuild_rating_summaries(session)} products")
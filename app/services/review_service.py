@@ -0,0 +1,97 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import Session
+
+from app.db.models.product import Product_rating, Product_Review_images
+from app.utils.pagination import Page, SortKey, keyset_paginate, row_value
+
+
+# ----------------------------------------review feed---------------------------------
+
+# Each sort is backed by the matching indexes on Product_rating
+REVIEW_SORT_KEYS = {
+    "newest": SortKey(
+        name="newest",
+        columns=(Product_rating.created_at, Product_rating.id),
+        row_key=lambda review: (
+            row_value(review, "created_at"),
+            row_value(review, "id"),
+        ),
+        descending=True,
+        parse=lambda values: (datetime.fromisoformat(values[0]), values[1]),
+    ),
+    "rating": SortKey(
+        name="rating",
+        columns=(
+            func.coalesce(Product_rating.rating, literal_column("0")),
+            Product_rating.id,
+        ),
+        row_key=lambda review: (
+            row_value(review, "rating") or 0,
+            row_value(review, "id"),
+        ),
+        descending=True,
+    ),
+}
+
+
+def get_review_sort(sort: str) -> SortKey:
+    if sort not in REVIEW_SORT_KEYS:
+        raise ValueError(
+            f"Invalid sort '{sort}', expected one of: {', '.join(REVIEW_SORT_KEYS)}"
+        )
+    return REVIEW_SORT_KEYS[sort]
+
+
+def get_review_images(db: Session, review_ids: List[int]) -> Dict[int, List[str]]:
+    # One IN query for the whole page instead of group_concat over the table
+    images = defaultdict(list)
+    if not review_ids:
+        return images
+    rows = (
+        db.query(Product_Review_images.product_rating_id, Product_Review_images.images)
+        .filter(Product_Review_images.product_rating_id.in_(review_ids))
+        .order_by(Product_Review_images.id)
+        .all()
+    )
+    for row in rows:
+        images[row.product_rating_id].append(row.images)
+    return images
+
+
+def format_review(review: Product_rating, images: List[str]) -> Dict[str, Any]:
+    return {
+        "id": review.id,
+        "product_id": review.product_id,
+        "user_name": review.user_name,
+        "title": review.title,
+        "review": review.review,
+        "rating": review.rating,
+        "created_at": (
+            review.created_at.strftime("%b %d, %Y") if review.created_at else None
+        ),
+        "review_images": images,
+    }
+
+
+def get_review_feed(
+    db: Session,
+    product_id: Optional[int] = None,
+    status: Optional[str] = "approved",
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> Page:
+    query = db.query(Product_rating)
+    if status:
+        query = query.filter(Product_rating.status == status)
+    if product_id is not None:
+        query = query.filter(Product_rating.product_id == product_id)
+
+    page = keyset_paginate(query, get_review_sort(sort), cursor, limit)
+    images = get_review_images(db, [review.id for review in page.items])
+    page.items = [format_review(review, images[review.id]) for review in page.items]
+    return page
@@ -0,0 +1,163 @@
+import difflib
+import math
+import re
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+# ----------------------------------------product full-text search---------------------------------
+
+# External-content FTS5 index over products; the triggers keep it in sync with
+# every insert, update and delete on the products table.
+PRODUCT_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        product_name,
+        description,
+        meta_keywords,
+        content='products',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts_vocab
+    USING fts5vocab(products_fts, 'row')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, product_name, description, meta_keywords)
+        VALUES (new.id, new.product_name, new.description, new.meta_keywords);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(
+            products_fts, rowid, product_name, description, meta_keywords
+        )
+        VALUES ('delete', old.id, old.product_name, old.description, old.meta_keywords);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au
+    AFTER UPDATE OF product_name, description, meta_keywords ON products BEGIN
+        INSERT INTO products_fts(
+            products_fts, rowid, product_name, description, meta_keywords
+        )
+        VALUES ('delete', old.id, old.product_name, old.description, old.meta_keywords);
+        INSERT INTO products_fts(rowid, product_name, description, meta_keywords)
+        VALUES (new.id, new.product_name, new.description, new.meta_keywords);
+    END
+    """,
+]
+
+# bm25 column weights: product_name, description, meta_keywords
+SEARCH_QUERY = text(
+    """
+    SELECT products.id AS id,
+           bm25(products_fts, 10.0, 1.0, 5.0) AS rank,
+           highlight(products_fts, 0, '<mark>', '</mark>') AS name_highlight,
+           snippet(products_fts, 1, '<mark>', '</mark>', '...', 12) AS snippet
+    FROM products_fts
+    JOIN products ON products.id = products_fts.rowid
+    WHERE products_fts MATCH :match AND products.status = 1
+    ORDER BY rank
+    LIMIT :limit
+    """
+)
+
+
+def ensure_product_search_index(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")
+        ).first()
+        for statement in PRODUCT_SEARCH_DDL:
+            conn.execute(text(statement))
+        if not exists:
+            # Backfill the index from rows written before it existed
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+
+def _tokenize(term: str) -> List[str]:
+    return re.findall(r"\w+", term.lower())
+
+
+def _match_expression(tokens: List[str]) -> str:
+    # Every token must match, each one as a prefix
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+CORRECTION_CUTOFF = 0.75
+
+VOCABULARY_QUERY = text(
+    """
+    SELECT term FROM products_fts_vocab
+    WHERE length(term) BETWEEN :shortest AND :longest
+    """
+)
+
+
+def _length_window(length: int) -> Tuple[int, int]:
+    # difflib's ratio is 2 * matches / (len(a) + len(b)) and matches can not
+    # exceed the shorter word, so terms outside this window never reach the
+    # cutoff and need not leave SQLite
+    cutoff = CORRECTION_CUTOFF
+    return (
+        math.ceil(length * cutoff / (2 - cutoff)),
+        math.floor(length * (2 - cutoff) / cutoff),
+    )
+
+
+def _correct_tokens(db: Session, tokens: List[str]) -> List[str]:
+    corrected = []
+    for token in tokens:
+        shortest, longest = _length_window(len(token))
+        candidates = [
+            row.term
+            for row in db.execute(
+                VOCABULARY_QUERY, {"shortest": shortest, "longest": longest}
+            )
+        ]
+        matches = difflib.get_close_matches(
+            token, candidates, n=1, cutoff=CORRECTION_CUTOFF
+        )
+        corrected.append(matches[0] if matches else token)
+    return corrected
+
+
+def search_products(db: Session, term: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Ranked full-text search over product name, description and meta keywords.
+    Falls back to the closest indexed spelling of each word when the literal
+    query has no hits.
+    """
+    tokens = _tokenize(term)
+    if not tokens:
+        return []
+
+    rows = db.execute(
+        SEARCH_QUERY, {"match": _match_expression(tokens), "limit": limit}
+    ).all()
+    if not rows:
+        corrected = _correct_tokens(db, tokens)
+        if corrected != tokens:
+            rows = db.execute(
+                SEARCH_QUERY, {"match": _match_expression(corrected), "limit": limit}
+            ).all()
+
+    return [
+        {
+            "id": row.id,
+            "rank": row.rank,
+            "name_highlight": row.name_highlight,
+            "snippet": row.snippet,
+        }
+        for row in rows
+    ]
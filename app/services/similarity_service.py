@@ -0,0 +1,190 @@
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, aliased
+
+from app.db.loading_profiles import product_query
+from app.db.models.orders import Order_details
+from app.db.models.product import Products, Similar_products
+from app.db.session import SessionLocal
+from app.services.job_queue_service import SIMILAR_PRODUCTS, enqueue_job
+
+
+# ----------------------------------------similar products index---------------------------------
+
+SIMILAR_PRODUCTS_LIMIT = 8
+# one shared order outweighs a shared category
+CATEGORY_WEIGHT = 1.0
+CO_PURCHASE_WEIGHT = 2.0
+
+
+def _co_purchase_counts(db: Session, product_ids: List[int]) -> dict:
+    other = aliased(Order_details)
+    rows = (
+        db.query(
+            Order_details.product_id,
+            other.product_id.label("other_product_id"),
+            func.count(func.distinct(Order_details.order_id)).label("orders"),
+        )
+        .join(other, other.order_id == Order_details.order_id)
+        .filter(
+            Order_details.product_id.in_(product_ids),
+            other.product_id != Order_details.product_id,
+        )
+        .group_by(Order_details.product_id, other.product_id)
+        .all()
+    )
+    counts = defaultdict(Counter)
+    for row in rows:
+        counts[row.product_id][row.other_product_id] = row.orders
+    return counts
+
+
+def refresh_similar_products(
+    db: Session, product_ids: Optional[Iterable[int]] = None
+) -> int:
+    """
+    Recompute the ranked similar products of `product_ids` (every active
+    product when None) from category matches and co-purchase counts, and
+    replace their rows in similar_products in one commit.
+    """
+    active_products = product_query(db).filter(Products.status == True)
+    if product_ids is None:
+        candidates = {product.id: product for product in active_products.all()}
+        targets = list(candidates)
+        stale = None
+    else:
+        stale = list(set(product_ids))
+        targets = [
+            product.id
+            for product in active_products.filter(Products.id.in_(stale)).all()
+        ]
+    co_purchases = _co_purchase_counts(db, targets) if targets else {}
+
+    if product_ids is not None and targets:
+        # only the target categories and co-purchased products can rank
+        categories = {
+            row.product_category
+            for row in db.query(Products.product_category).filter(
+                Products.id.in_(targets)
+            )
+            if row.product_category
+        }
+        bought_with = {
+            other_id for counts in co_purchases.values() for other_id in counts
+        }
+        candidates = {
+            product.id: product
+            for product in active_products.filter(
+                or_(
+                    Products.product_category.in_(categories),
+                    Products.id.in_(bought_with | set(targets)),
+                )
+            ).all()
+        }
+
+    by_category = defaultdict(list)
+    if targets:
+        for product in candidates.values():
+            if product.product_category:
+                by_category[product.product_category].append(product.id)
+
+    now = datetime.utcnow()
+    rows = []
+    for product_id in targets:
+        scores = Counter()
+        category = candidates[product_id].product_category
+        for other_id in by_category.get(category, []) if category else []:
+            scores[other_id] += CATEGORY_WEIGHT
+        for other_id, orders in co_purchases[product_id].items():
+            if other_id in candidates:
+                scores[other_id] += CO_PURCHASE_WEIGHT * orders
+        scores.pop(product_id, None)
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], candidates[item[0]].priority or 0, item[0]),
+        )[:SIMILAR_PRODUCTS_LIMIT]
+        for rank, (other_id, score) in enumerate(ranked):
+            rows.append(
+                {
+                    "product_id": product_id,
+                    "similar_product_id": other_id,
+                    "score": score,
+                    "rank": rank,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+
+    try:
+        # inactive or deleted products in product_ids lose their rows too
+        stale_rows = db.query(Similar_products)
+        if stale is not None:
+            stale_rows = stale_rows.filter(Similar_products.product_id.in_(stale))
+        stale_rows.delete(synchronize_session=False)
+        db.bulk_insert_mappings(Similar_products, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(targets)
+
+
+def queue_similar_products_refresh(
+    db: Session,
+    product_ids: Optional[List[int]] = None,
+    category: Optional[str] = None,
+) -> None:
+    # a SIMILAR_PRODUCTS job for app.worker, added to the caller's transaction
+    enqueue_job(
+        db, SIMILAR_PRODUCTS, {"product_ids": product_ids, "category": category}
+    )
+
+
+def refresh_similar_products_job(
+    product_ids: Optional[List[int]] = None, category: Optional[str] = None
+) -> None:
+    """
+    Job entry point. `category` also refreshes every product in that
+    category, whose candidate set changes when a member is added or removed.
+    With neither argument the whole index is rebuilt. Errors propagate so the
+    job queue retries the job and dead-letters it after JOB_MAX_ATTEMPTS.
+    """
+    with SessionLocal() as db:
+        if product_ids is None and not category:
+            refresh_similar_products(db)
+            return
+        ids = list(product_ids or [])
+        if category:
+            ids += [
+                row.id
+                for row in db.query(Products.id).filter(
+                    Products.product_category == category
+                )
+            ]
+        refresh_similar_products(db, ids)
+
+
+def ensure_similar_products(db: Session) -> None:
+    # first start on an existing database: build the whole index once
+    if db.query(Similar_products.id).first() is None:
+        refresh_similar_products(db)
+
+
+def get_similar_products(db: Session, product_id: int) -> List[Products]:
+    return (
+        product_query(db)
+        .join(Similar_products, Similar_products.similar_product_id == Products.id)
+        .filter(Similar_products.product_id == product_id, Products.status == True)
+        .order_by(Similar_products.rank)
+        .all()
+    )
+
+
+if __name__ == "__main__":
+    # python -m app.services.similarity_service
+    with SessionLocal() as session:
+        print(f"Refreshed similar products for {refresh_similar_products(session)} products")
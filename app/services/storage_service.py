@@ -0,0 +1,247 @@
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Optional
+from urllib.parse import quote
+
+from app.core.config import settings
+
+
+# ----------------------------------------object storage---------------------------------
+# Keys are relative paths such as "images/banners/a.png", which is also what
+# the media tables store. Media and invoices each get a backend from
+# settings: "local" writes under a directory served at IMAGE_URL, "s3" writes
+# to S3_BUCKET_NAME.
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StorageError(Exception):
+    pass
+
+
+class Storage(ABC):
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        ...
+
+    @abstractmethod
+    def put_stream(
+        self, key: str, stream: BinaryIO, content_type: Optional[str] = None
+    ) -> str:
+        """Upload from a file object without reading it into memory."""
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete `key`; deleting a missing key is not an error."""
+
+    @abstractmethod
+    def url(self, key: str, expires_in: Optional[int] = None) -> str:
+        """Public URL, or a presigned one valid for `expires_in` seconds."""
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise StorageError(f"Key {key!r} is outside the storage root")
+        return path
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as buffer:
+            buffer.write(data)
+        return key
+
+    def put_stream(
+        self, key: str, stream: BinaryIO, content_type: Optional[str] = None
+    ) -> str:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as buffer:
+            shutil.copyfileobj(stream, buffer, CHUNK_SIZE)
+        return key
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), "rb") as buffer:
+                return buffer.read()
+        except FileNotFoundError:
+            raise StorageError(f"No object {key!r}")
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key: str, expires_in: Optional[int] = None) -> str:
+        # served as static files; there is nothing to sign
+        return self.base_url + quote(key)
+
+
+class S3Storage(Storage):
+    def __init__(self, bucket: str, region: str, public: bool = True):
+        if not bucket:
+            raise StorageError("S3_BUCKET_NAME is not set")
+        self.bucket = bucket
+        self.region = region
+        self.public = public
+        self._client = None
+        self._transfer = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        # boto3 is imported and the client built on first use, so processes
+        # that never touch S3 start fast and need no AWS credentials
+        with self._lock:
+            if self._client is None:
+                import boto3
+                from boto3.s3.transfer import TransferConfig
+                from botocore.config import Config
+
+                self._client = boto3.client(
+                    "s3",
+                    region_name=self.region,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY,
+                    aws_secret_access_key=settings.AWS_SECRET_KEY,
+                    config=Config(
+                        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                        retries={"max_attempts": 3, "mode": "standard"},
+                    ),
+                )
+                # uploads past the threshold go up as parallel multipart parts
+                self._transfer = TransferConfig(
+                    multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+                    multipart_chunksize=settings.S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+                    max_concurrency=settings.S3_MAX_CONCURRENCY,
+                )
+            return self._client
+
+    def _extra_args(self, content_type: Optional[str]) -> Dict[str, str]:
+        return {"ContentType": content_type} if content_type else {}
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        self._get_client().put_object(
+            Bucket=self.bucket, Key=key, Body=data, **self._extra_args(content_type)
+        )
+        return key
+
+    def put_stream(
+        self, key: str, stream: BinaryIO, content_type: Optional[str] = None
+    ) -> str:
+        client = self._get_client()
+        client.upload_fileobj(
+            stream,
+            self.bucket,
+            key,
+            ExtraArgs=self._extra_args(content_type),
+            Config=self._transfer,
+        )
+        return key
+
+    def get(self, key: str) -> bytes:
+        client = self._get_client()
+        try:
+            return client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except client.exceptions.NoSuchKey:
+            raise StorageError(f"No object {key!r}")
+
+    def delete(self, key: str) -> None:
+        self._get_client().delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key: str, expires_in: Optional[int] = None) -> str:
+        if self.public and expires_in is None:
+            return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{quote(key)}"
+        return self._get_client().generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in or settings.S3_PRESIGNED_URL_SECONDS,
+        )
+
+
+def create_storage(backend: str, root: str) -> Storage:
+    if backend == "s3":
+        return S3Storage(
+            settings.S3_BUCKET_NAME, settings.AWS_REGION, public=settings.S3_PUBLIC_URLS
+        )
+    if backend == "local":
+        return LocalStorage(root, settings.IMAGE_URL)
+    raise StorageError(f"Unknown storage backend {backend!r}")
+
+
+_storages: Dict[str, Storage] = {}
+_storages_lock = threading.Lock()
+
+
+def _get_storage(name: str, backend: str, root: str) -> Storage:
+    with _storages_lock:
+        if name not in _storages:
+            _storages[name] = create_storage(backend, root)
+        return _storages[name]
+
+
+def get_media_storage() -> Storage:
+    # banners, categories, products and reviews
+    return _get_storage(
+        "media", settings.MEDIA_STORAGE_BACKEND, settings.MEDIA_STORAGE_ROOT
+    )
+
+
+def get_invoice_storage() -> Storage:
+    return _get_storage(
+        "invoices", settings.INVOICE_STORAGE_BACKEND, settings.INVOICE_STORAGE_ROOT
+    )
+
+
+def benchmark_storage(
+    storage: Optional[Storage] = None, objects: int = 100, size_kb: int = 256
+) -> Dict[str, float]:
+    """
+    Put, get and delete `objects` objects of `size_kb` through `storage`
+    (a scratch LocalStorage by default). Returns operations per second.
+    """
+    import tempfile
+
+    scratch = None
+    if storage is None:
+        scratch = tempfile.mkdtemp()
+        storage = LocalStorage(scratch, "http://localhost/")
+    data = os.urandom(size_kb * 1024)
+    keys = [f"bench/{number}.bin" for number in range(objects)]
+    result: Dict[str, float] = {}
+    try:
+        for operation in ("put", "get", "delete"):
+            started = time.perf_counter()
+            for key in keys:
+                if operation == "put":
+                    storage.put(key, data, "application/octet-stream")
+                elif operation == "get":
+                    storage.get(key)
+                else:
+                    storage.delete(key)
+            result[f"{operation}_per_second"] = objects / (time.perf_counter() - started)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return result
+
+
+if __name__ == "__main__":
+    # python -m app.services.storage_service [media|invoices]
+    import sys
+
+    target = {"media": get_media_storage, "invoices": get_invoice_storage}
+    storage = target[sys.argv[1]]() if len(sys.argv) > 1 else None
+    print(benchmark_storage(storage))
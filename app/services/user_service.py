@@ -1,4 +1,6 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.db.models.user import User
 from app.schemas.request import UserCreate, UserUpdate
 from app.core.security import get_password_hash, verify_password
@@ -63,3 +65,15 @@ def admin_user_login(*, session: Session, email: str, password: str) -> User:
     if not db_user or not verify_password(password, db_user.password):
         raise ValueError("Invalid credentials")
     return db_user
+
+
+async def admin_user_login_async(
+    *, session: AsyncSession, email: str, password: str
+) -> User:
+    db_user = await session.run_sync(get_user_by_email_phone, email)
+    if not db_user:
+        return None
+    # bcrypt is slow by design; keep it off the event loop
+    if not await run_in_threadpool(verify_password, password, db_user.password):
+        raise ValueError("Invalid credentials")
+    return db_user
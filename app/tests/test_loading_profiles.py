@@ -0,0 +1,163 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+
+from app.db.loading_profiles import product_query
+from app.db.models.product import (
+    Certificate_colors,
+    Frame_colors,
+    Frame_size,
+    Frame_Thickness,
+    Product_images,
+    Product_rating,
+    Product_Review_images,
+    Product_tag_options,
+    Products,
+)
+
+PRODUCTS = 3
+CHILDREN = 2
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        for number in range(PRODUCTS):
+            product = Products(product_name=f"product {number}", status=True)
+            db.add(product)
+            db.flush()
+            for child in range(CHILDREN):
+                db.add(Product_images(product_id=product.id, images=f"{child}.png"))
+                db.add(Product_tag_options(product_id=product.id, name=f"tag {child}"))
+                db.add(Certificate_colors(product_id=product.id, name=f"c{child}"))
+                db.add(Frame_colors(product_id=product.id, name=f"f{child}"))
+                db.add(Frame_size(product_id=product.id, name=f"s{child}"))
+                db.add(Frame_Thickness(product_id=product.id, name=f"t{child}"))
+                rating = Product_rating(
+                    product_id=product.id, rating=5, status="approved"
+                )
+                db.add(rating)
+                db.flush()
+                db.add(
+                    Product_Review_images(product_rating_id=rating.id, images="r.png")
+                )
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+
+DETAIL_RELATIONSHIPS = [
+    "product_images",
+    "product_ratings",
+    "product_tag_options",
+    "certificate_colors",
+    "frame_colors",
+    "frame_size",
+    "frame_thickness",
+]
+ADMIN_RELATIONSHIPS = ["product_images", "product_ratings"]
+
+
+def _touch(product, relationships):
+    return sum(len(getattr(product, name)) for name in relationships)
+
+
+def _rows(rows):
+    return sorted((row.model_dump() for row in rows), key=lambda row: row["id"])
+
+
+def _graph(products, relationships):
+    # product columns plus every related row, comparable across sessions
+    graph = {}
+    for product in products:
+        node = {"product": product.model_dump()}
+        for name in relationships:
+            node[name] = _rows(getattr(product, name))
+        if "product_ratings" in relationships:
+            node["product_review_images"] = {
+                rating.id: _rows(rating.product_review_images)
+                for rating in product.product_ratings
+            }
+        graph[product.id] = node
+    return graph
+
+
+def _lazy_graph(engine, relationships):
+    # the same rows through the models' default lazy loading
+    with Session(engine) as db:
+        return _graph(db.query(Products).all(), relationships)
+
+
+def test_list_profile_loads_products_only(engine, statements):
+    with Session(engine) as db:
+        products = product_query(db, "list").all()
+        # noload: children read as empty without querying
+        children = sum(_touch(product, ADMIN_RELATIONSHIPS) for product in products)
+        executed = len(statements)
+        graph = _graph(products, [])
+
+    assert len(products) == PRODUCTS
+    assert children == 0
+    assert executed == 1
+    assert graph == _lazy_graph(engine, [])
+
+
+def test_detail_profile_one_query_per_child_table(engine, statements):
+    with Session(engine) as db:
+        products = product_query(db, "detail").all()
+        loaded = len(statements)
+        graph = _graph(products, DETAIL_RELATIONSHIPS)
+        executed = len(statements)
+
+    assert len(products) == PRODUCTS
+    assert sum(
+        len(node[name]) for node in graph.values() for name in DETAIL_RELATIONSHIPS
+    ) == PRODUCTS * CHILDREN * len(DETAIL_RELATIONSHIPS)
+    # products, seven child tables and review images
+    assert loaded == 9
+    assert executed == loaded
+    # a loader option that drops or filters a relationship shows up here
+    assert graph == _lazy_graph(engine, DETAIL_RELATIONSHIPS)
+
+
+def test_admin_profile_loads_media_and_reviews(engine, statements):
+    with Session(engine) as db:
+        products = product_query(db, "admin").all()
+        loaded = len(statements)
+        graph = _graph(products, ADMIN_RELATIONSHIPS)
+        executed = len(statements)
+
+    assert len(products) == PRODUCTS
+    assert sum(
+        len(images)
+        for node in graph.values()
+        for images in node["product_review_images"].values()
+    ) == PRODUCTS * CHILDREN
+    assert loaded == 4
+    assert executed == loaded
+    assert graph == _lazy_graph(engine, ADMIN_RELATIONSHIPS)
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        product_query(None, "everything")
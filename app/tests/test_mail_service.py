@@ -0,0 +1,142 @@
+import asyncio
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.services.mail_service import MailDeliveryError, MailDispatcher, build_message
+
+
+class RecordingHandler:
+    """Accepts mail, noting which SMTP session delivered each message."""
+
+    def __init__(self, reply_first=None):
+        # e.g. "451 ..." to refuse the first message once
+        self.reply_first = reply_first
+        self.sessions = []
+        self.delivered = []
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reply_first is not None:
+            reply, self.reply_first = self.reply_first, None
+            return reply
+        if not any(seen is session for seen in self.sessions):
+            self.sessions.append(session)
+        self.delivered.append(envelope.content)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    controllers = []
+
+    def start(handler):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            host, port = probe.getsockname()
+        controller = Controller(handler, hostname=host, port=port)
+        controller.start()
+        controllers.append(controller)
+        return host, port
+
+    yield start
+    for controller in controllers:
+        controller.stop()
+
+
+def _messages(count):
+    return [
+        build_message(
+            f"customer{number}@example.com",
+            f"order {number}",
+            "<p>thanks</p>",
+            sender="shop@example.com",
+        )
+        for number in range(count)
+    ]
+
+
+def _deliver(dispatcher, messages):
+    async def run():
+        try:
+            return await dispatcher.send_many(messages)
+        finally:
+            await dispatcher.close()
+
+    return asyncio.run(run())
+
+
+def test_pooled_connections_carry_many_messages(smtp_server):
+    handler = RecordingHandler()
+    host, port = smtp_server(handler)
+    dispatcher = MailDispatcher(
+        hostname=host, port=port, pool_size=2, messages_per_connection=100
+    )
+
+    failures = _deliver(dispatcher, _messages(20))
+
+    assert failures == [None] * 20
+    assert len(handler.delivered) == 20
+    assert dispatcher.stats.sent == 20
+    assert dispatcher.stats.connections <= 2
+    assert len(handler.sessions) <= 2
+
+
+def test_reconnects_after_messages_per_connection(smtp_server):
+    handler = RecordingHandler()
+    host, port = smtp_server(handler)
+    dispatcher = MailDispatcher(
+        hostname=host, port=port, pool_size=1, messages_per_connection=3
+    )
+
+    failures = _deliver(dispatcher, _messages(10))
+
+    assert failures == [None] * 10
+    assert len(handler.delivered) == 10
+    # 3 + 3 + 3 + 1
+    assert dispatcher.stats.connections == 4
+    assert len(handler.sessions) == 4
+
+
+def test_retries_transient_replies(smtp_server):
+    handler = RecordingHandler(reply_first="451 4.3.0 Try again later")
+    host, port = smtp_server(handler)
+    dispatcher = MailDispatcher(hostname=host, port=port, pool_size=1, backoff=0)
+
+    failures = _deliver(dispatcher, _messages(5))
+
+    assert failures == [None] * 5
+    assert len(handler.delivered) == 5
+    assert dispatcher.stats.retries == 1
+    assert dispatcher.stats.failed == 0
+
+
+def test_permanent_replies_fail_without_retry(smtp_server):
+    handler = RecordingHandler(reply_first="550 5.1.1 No such user")
+    host, port = smtp_server(handler)
+    dispatcher = MailDispatcher(hostname=host, port=port, pool_size=1, backoff=0)
+
+    failures = _deliver(dispatcher, _messages(3))
+
+    assert isinstance(failures[0], MailDeliveryError)
+    assert failures[1:] == [None, None]
+    assert dispatcher.stats.retries == 0
+    assert dispatcher.stats.failed == 1
+
+
+def test_close_fails_queued_mail_when_senders_died(smtp_server):
+    host, port = smtp_server(RecordingHandler())
+    dispatcher = MailDispatcher(hostname=host, port=port, pool_size=1)
+
+    async def run():
+        dispatcher.start()
+        for sender in dispatcher._senders:
+            sender.cancel()
+        await asyncio.gather(*dispatcher._senders, return_exceptions=True)
+        sending = asyncio.create_task(dispatcher.send(_messages(1)[0]))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(dispatcher.close(), timeout=5)
+        with pytest.raises(MailDeliveryError):
+            await sending
+
+    asyncio.run(run())
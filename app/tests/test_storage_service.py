@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+from app.services.storage_service import LocalStorage, Storage, StorageError
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path), "http://localhost/")
+
+
+def test_put_get_delete(storage, tmp_path):
+    assert storage.put("images/banners/a.png", b"banner", "image/png") == (
+        "images/banners/a.png"
+    )
+    assert (tmp_path / "images" / "banners" / "a.png").read_bytes() == b"banner"
+    assert storage.get("images/banners/a.png") == b"banner"
+
+    storage.delete("images/banners/a.png")
+    with pytest.raises(StorageError):
+        storage.get("images/banners/a.png")
+    # deleting a missing key is not an error
+    storage.delete("images/banners/a.png")
+
+
+def test_put_stream(storage):
+    data = b"x" * (3 * 1024 * 1024 + 17)  # more than one copy chunk
+    assert storage.put_stream("invoice/a.pdf", io.BytesIO(data)) == "invoice/a.pdf"
+    assert storage.get("invoice/a.pdf") == data
+
+
+def test_url(storage):
+    assert storage.url("images/a b.png") == "http://localhost/images/a%20b.png"
+
+
+@pytest.mark.parametrize(
+    "key", ["../outside.png", "images/../../outside.png", "/etc/passwd"]
+)
+def test_rejects_keys_outside_root(storage, tmp_path, key):
+    for operation in (
+        lambda: storage.put(key, b"data"),
+        lambda: storage.put_stream(key, io.BytesIO(b"data")),
+        lambda: storage.get(key),
+        lambda: storage.delete(key),
+    ):
+        with pytest.raises(StorageError):
+            operation()
+    assert not (tmp_path.parent / "outside.png").exists()
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        Storage()
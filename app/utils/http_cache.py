@@ -0,0 +1,105 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+
+
+# ----------------------------------------conditional GET---------------------------------
+
+
+def _route_etag(request: Request, version: str, encoding: Optional[str] = None) -> str:
+    # The same catalog version renders differently per path and query string
+    variant = f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+    digest = hashlib.sha256(variant.encode()).hexdigest()[:12]
+    if encoding and encoding != "identity":
+        # a strong ETag names one exact body, so each content coding gets its own
+        return f'"{version}-{digest}-{encoding}"'
+    return f'"{version}-{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    # If-None-Match uses weak comparison
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return modified <= since
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    version: str,
+    last_modified: datetime,
+    cache_control: str,
+    encoding: Optional[str] = None,
+) -> Optional[Response]:
+    """
+    Set ETag, Last-Modified and Cache-Control on `response`. Returns an empty
+    304 response when the client's validators still match, so the route can
+    return it before doing any work. Routes that negotiate a content coding
+    pass it as `encoding`.
+    """
+    headers = {
+        "ETag": _route_etag(request, version, encoding),
+        "Last-Modified": _http_date(last_modified),
+        "Cache-Control": cache_control,
+    }
+    if encoding is not None:
+        headers["Vary"] = "Accept-Encoding"
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, headers["ETag"])
+    elif if_modified_since is not None:
+        not_modified = _not_modified_since(if_modified_since, last_modified)
+    else:
+        not_modified = False
+
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def cache_policy(name: str) -> str:
+    return settings.CACHE_CONTROL_POLICIES.get(name, "no-cache")
+
+
+def catalog_not_modified(
+    request: Request,
+    response: Response,
+    snapshot,
+    policy: str,
+    encoding: Optional[str] = None,
+) -> Optional[Response]:
+    # snapshot is the current CatalogSnapshot; its validators cover every
+    # catalog table, so the check never touches the database
+    return conditional_response(
+        request,
+        response,
+        snapshot.etag,
+        snapshot.last_modified,
+        cache_policy(policy),
+        encoding,
+    )
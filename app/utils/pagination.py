@@ -0,0 +1,131 @@
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+
+# ----------------------------------------keyset pagination---------------------------------
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """
+    A stable sort order. `columns` are the SQL expressions to order by (the last
+    one must be unique, usually the id) and `row_key` returns the same values
+    from a result row (an ORM object or a serialized dict). `parse` turns decoded cursor values back into
+    values the SQL expressions can be compared with. `prepare` adds any joins
+    the columns need.
+    """
+
+    name: str
+    columns: Tuple[Any, ...]
+    row_key: Callable[[dict], tuple]
+    descending: bool = False
+    parse: Callable[[list], tuple] = tuple
+    prepare: Callable[[Query], Query] = lambda query: query
+
+
+@dataclass
+class Page:
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def row_value(row: Any, name: str) -> Any:
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def encode_cursor(values: tuple, direction: str) -> str:
+    raw = json.dumps({"v": jsonable_encoder(values), "d": direction})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[list, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = data["v"], data["d"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values, direction
+
+
+def _build_page(
+    rows: list,
+    sort: SortKey,
+    limit: int,
+    forward: bool,
+    has_cursor: bool,
+) -> Page:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+
+    page = Page(items=rows)
+    if not rows:
+        return page
+    # Walking backwards, the extra row tells us about the previous page instead
+    has_next, has_prev = (has_more, has_cursor) if forward else (has_cursor, has_more)
+    if has_next:
+        page.next_cursor = encode_cursor(sort.row_key(rows[-1]), "next")
+    if has_prev:
+        page.prev_cursor = encode_cursor(sort.row_key(rows[0]), "prev")
+    return page
+
+
+def keyset_paginate(
+    query: Query, sort: SortKey, cursor: Optional[str], limit: int
+) -> Page:
+    """Seek past the cursor row with a row-value comparison instead of OFFSET."""
+    values, direction = decode_cursor(cursor) if cursor else (None, "next")
+    forward = direction == "next"
+    descending = sort.descending == forward
+
+    query = sort.prepare(query)
+    if values is not None:
+        key = tuple_(*sort.columns)
+        anchor = tuple_(*sort.parse(values))
+        query = query.filter(key < anchor if descending else key > anchor)
+
+    order_by = [column.desc() if descending else column.asc() for column in sort.columns]
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+    return _build_page(rows, sort, limit, forward, values is not None)
+
+
+def paginate_sorted(
+    rows: List[dict], sort: SortKey, cursor: Optional[str], limit: int
+) -> Page:
+    """Keyset pagination over rows already sorted ascending by `sort.row_key`."""
+    values, direction = decode_cursor(cursor) if cursor else (None, "next")
+    forward = direction == "next"
+    descending = sort.descending == forward
+
+    if not descending:
+        start = 0 if values is None else bisect_right(rows, tuple(values), key=sort.row_key)
+        chunk = rows[start : start + limit + 1]
+    else:
+        end = len(rows) if values is None else bisect_left(rows, tuple(values), key=sort.row_key)
+        chunk = rows[max(0, end - limit - 1) : end][::-1]
+    return _build_page(chunk, sort, limit, forward, values is not None)
+
+
+def set_page_headers(response: Response, page: Page) -> None:
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.prev_cursor:
+        response.headers["X-Prev-Cursor"] = page.prev_cursor
+
+
+def clamp_limit(limit: int, maximum: int) -> int:
+    return max(1, min(limit, maximum))
@@ -1,108 +1,48 @@
-from io import BytesIO
-import os
-from app.core.mail_conf import mail_conf
 from app.db.models.orders import Orders
-from fastapi_mail import FastMail, MessageSchema, MessageType
-from jinja2 import Environment, FileSystemLoader
-from datetime import datetime, timedelta
+from app.db.session import SessionLocal
+from app.services.order_document_service import get_order_html
+from app.services.order_summary_service import set_order_invoice
+from datetime import datetime
 from sqlalchemy.orm import Session
 from app.core.config import Settings
-import boto3
-import pdfkit
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
-env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
-template = env.get_template("index.html")
+from app.services.invoice_service import render_invoice
+from app.services.mail_service import build_message, get_mail_dispatcher
+from app.services.storage_service import get_invoice_storage
 
 settings = Settings()
 
 
-async def order_email_sent(email_to, data):
+async def order_email_sent(email_to, html_content):
     try:
-        # Get today's date
-        today = datetime.today()
-        # Add 4 days
-        next_date = today + timedelta(days=4)
-        html_content = template.render(
-            data=data,
-            order_placed_date=next_date.strftime("%Y-%m-%d"),
-            day_name=next_date.strftime("%A"),  # e.g., Saturday
-        )
-
-        message = MessageSchema(
-            subject="Order Confirmation",
-            recipients=[email_to],
-            body=html_content,
-            subtype=MessageType.html,  # or .plain for plain text
+        # pooled SMTP connections instead of a new session per message
+        await get_mail_dispatcher().send(
+            build_message(email_to, "Order Confirmation", html_content)
         )
-        fm = FastMail(mail_conf)
-        await fm.send_message(message)
     except Exception as error:
         print("error email", email_to, error)
-
-
-# S3 Client
-s3_client = boto3.client(
-    "s3",
-    region_name=settings.AWS_REGION,
-    aws_access_key_id=settings.AWS_ACCESS_KEY,
-    aws_secret_access_key=settings.AWS_SECRET_KEY,
-)
-
-PDF_KIT_OPTIONS = {
-    "page-size": "A4",
-    "margin-top": "0.0in",
-    "margin-right": "0.2in",
-    "margin-bottom": "0.0in",
-    "margin-left": "0.2in",
-    "minimum-font-size": "20",
-    "enable-local-file-access": None,
-}
+        raise  # the job queue retries it
 
 
 def generate_pdf_and_upload_to_s3(
-    db: Session, file_name="order_invoice", data={}, order_id=""
+    db: Session, file_name="order_invoice", html_content="", order_id=""
 ) -> str:
     """
-    Generate a PDF from HTML, upload it to S3, and return the public URL.
+    Generate a PDF from HTML, upload it to S3, and return its storage key.
 
     :param html_content: HTML string to convert to PDF
     :param file_name: Name of the file to save in S3
-    :param data: Data to render in the HTML template
-    :return: Public URL of the uploaded PDF
+    :return: Storage key of the uploaded PDF
     """
     try:
-        # Get today's date
-        today = datetime.today()
-
-        # Add 4 days
-        next_date = today + timedelta(days=4)
-
-        # Load the Jinja2 template
-        html_content = template.render(
-            data=data,
-            order_placed_date=next_date.strftime("%Y-%m-%d"),
-            day_name=next_date.strftime("%A"),  # e.g., Saturday
-        )
-        # Render the template with dynamic data
-        # Generate PDF in memory
-        pdf_data = pdfkit.from_string(html_content, False, options=PDF_KIT_OPTIONS)
-        pdf_file = BytesIO(pdf_data)
+        # Generate PDF in the invoice render pool
+        pdf_data = render_invoice(html_content)
         # Generate unique file name with timestamp
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-        s3_file_name = f"invoice/{file_name}_{timestamp}.pdf"
-        # Upload PDF to S3
-        s3_client.upload_fileobj(
-            pdf_file,
-            settings.S3_BUCKET_NAME,
-            s3_file_name,
-            ExtraArgs={"ContentType": "application/pdf"},
-        )
-
-        # Generate public URL
-        s3_url = f"https://{settings.S3_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/{s3_file_name}"
-        print("s3_url", s3_url)
+        s3_file_name = f"invoice/{file_name}_{order_id}_{timestamp}.pdf"
+        # Upload PDF to invoice storage (S3 unless configured otherwise)
+        get_invoice_storage().put(s3_file_name, pdf_data, "application/pdf")
+        # the key is stored, not a URL; presigned URLs would expire, so
+        # readers sign it through get_invoice_url
         # Optionally update payment details in the database
         # Step 1: Fetch the order
         order = db.query(Orders).filter(Orders.txn_id == order_id).first()
@@ -110,13 +50,26 @@ def generate_pdf_and_upload_to_s3(
         if not order:
             raise Exception("Order not found")
         # Step 3: Update invoice_id
-        order.invoice = s3_url
+        order.invoice = s3_file_name
+        set_order_invoice(db, order_id, s3_file_name)
         # Step 4: Commit the change
         db.commit()
         db.refresh(order)  # Optional: Refresh to get updated values
         # update_payment_receipt_details(db=db, payment_log_id=payment_id, payment_receipt_url=s3_url)
-        return s3_url
+        return s3_file_name
 
     except Exception as e:
         print(f"Error generating and uploading PDF: {e}")
         raise
+
+
+def generate_invoice_job(file_name="order_invoice", order_id="") -> str:
+    # background task: the request's session is closed by the time this runs
+    with SessionLocal() as db:
+        return generate_pdf_and_upload_to_s3(
+            db=db,
+            file_name=file_name,
+            # the order email's HTML, rendered once by the order documents job
+            html_content=get_order_html(db, order_id),
+            order_id=order_id,
+        )
@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import os
+import signal
+import socket
+from typing import Any, Awaitable, Callable, Dict, Union
+
+from sqlmodel import SQLModel
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.session import SessionLocal, engine
+from app.services.job_queue_service import (
+    DEAD,
+    ORDER_DOCUMENTS,
+    ORDER_EMAIL,
+    ORDER_INVOICE,
+    SIMILAR_PRODUCTS,
+    ClaimedJob,
+    claim_jobs,
+    complete_job,
+    fail_job,
+    requeue_dead_jobs,
+)
+from app.services.invoice_service import shutdown_invoice_renderer
+from app.services.mail_service import close_mail_dispatcher
+from app.services.order_document_service import (
+    get_order_html,
+    render_order_documents,
+)
+from app.services.similarity_service import refresh_similar_products_job
+from app.services.template_service import get_render_stats
+from app.utils.task import generate_invoice_job, order_email_sent
+
+
+# ----------------------------------------job worker---------------------------------
+# Drains the jobs table. Run it next to the API (see docker-compose.yml):
+#   python -m app.worker [--concurrency N]
+# For local development the web process can run the slots from its lifespan
+# instead (JOB_WORKER_IN_WEB=true).
+# Sync handlers run in the threadpool, async ones on the worker's loop.
+
+Handler = Callable[[Dict[str, Any]], Union[Any, Awaitable[Any]]]
+
+
+def _load_order_html(txn_id: str) -> str:
+    with SessionLocal() as db:
+        return get_order_html(db, txn_id)
+
+
+def render_documents(payload: Dict[str, Any]) -> None:
+    with SessionLocal() as db:
+        render_order_documents(db, payload["txn_id"], payload["email_to"])
+
+
+async def send_order_email(payload: Dict[str, Any]) -> None:
+    html = await run_in_threadpool(_load_order_html, payload["txn_id"])
+    await order_email_sent(email_to=payload["email_to"], html_content=html)
+
+
+def generate_order_invoice(payload: Dict[str, Any]) -> str:
+    return generate_invoice_job(file_name="order_invoice", order_id=payload["txn_id"])
+
+
+def refresh_similar_products(payload: Dict[str, Any]) -> None:
+    refresh_similar_products_job(
+        product_ids=payload.get("product_ids"), category=payload.get("category")
+    )
+
+
+JOB_HANDLERS: Dict[str, Handler] = {
+    ORDER_DOCUMENTS: render_documents,
+    ORDER_EMAIL: send_order_email,
+    ORDER_INVOICE: generate_order_invoice,
+    SIMILAR_PRODUCTS: refresh_similar_products,
+}
+
+
+def _claim(worker_id: str):
+    with SessionLocal() as db:
+        return claim_jobs(db, worker_id)
+
+
+def _complete(job: ClaimedJob, worker_id: str) -> None:
+    with SessionLocal() as db:
+        complete_job(db, job, worker_id)
+
+
+def _fail(job: ClaimedJob, worker_id: str, error: str) -> str:
+    with SessionLocal() as db:
+        return fail_job(db, job, worker_id, error)
+
+
+async def run_job(job: ClaimedJob, worker_id: str) -> None:
+    try:
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"No handler for job kind {job.kind}")
+        if asyncio.iscoroutinefunction(handler):
+            await handler(job.payload)
+        else:
+            await run_in_threadpool(handler, job.payload)
+    except Exception as error:
+        status = await run_in_threadpool(_fail, job, worker_id, repr(error))
+        log = logger.error if status == DEAD else logger.warning
+        log(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed: {error}")
+        return
+    await run_in_threadpool(_complete, job, worker_id)
+
+
+async def _work(worker_id: str, stopping: asyncio.Event) -> None:
+    # one job at a time per slot; an idle slot polls every JOB_POLL_SECONDS
+    while not stopping.is_set():
+        try:
+            jobs = await run_in_threadpool(_claim, worker_id)
+        except Exception as error:
+            logger.error(f"Job claim failed: {error}")
+            jobs = []
+        for job in jobs:
+            await run_job(job, worker_id)
+        if jobs:
+            continue
+        try:
+            await asyncio.wait_for(stopping.wait(), timeout=settings.JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_job_slots(concurrency: int, stopping: asyncio.Event) -> None:
+    """Work `concurrency` slots until `stopping` is set, then release resources."""
+    host = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Job worker {host} started with {concurrency} slots")
+    try:
+        await asyncio.gather(
+            *(_work(f"{host}:{slot}", stopping) for slot in range(concurrency))
+        )
+    finally:
+        await close_mail_dispatcher()
+        shutdown_invoice_renderer()
+        logger.info(f"Job worker {host} stopped; template renders {get_render_stats()}")
+
+
+async def run_worker(concurrency: int = settings.JOB_WORKER_CONCURRENCY) -> None:
+    SQLModel.metadata.create_all(bind=engine)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        # finish the jobs in hand, then exit
+        loop.add_signal_handler(signum, stopping.set)
+    await run_job_slots(concurrency, stopping)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drain the background job queue")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY
+    )
+    parser.add_argument(
+        "--requeue-dead",
+        nargs="?",
+        const="",
+        metavar="KIND",
+        help="retry dead-lettered jobs (optionally of one kind) and exit",
+    )
+    args = parser.parse_args()
+    if args.requeue_dead is not None:
+        with SessionLocal() as session:
+            print(f"Requeued {requeue_dead_jobs(session, args.requeue_dead or None)} jobs")
+    else:
+        asyncio.run(run_worker(args.concurrency))
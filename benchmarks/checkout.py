@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlmodel import SQLModel
+
+from app.db.models.carts import Carts
+from app.db.models.product import Products
+from app.schemas.request import OrderCreatePayload
+from app.services.order_service import place_order
+
+
+# ----------------------------------------checkout benchmarks---------------------------------
+# Run against scratch SQLite files, never the app database:
+#   python -m benchmarks.checkout [--orders N] [--concurrency N]
+# To compare with an older checkout, run the same command on a checkout of
+# that commit (git worktree add ../baseline <commit>).
+
+
+def _bench_payload(lines_per_order: int) -> OrderCreatePayload:
+    return OrderCreatePayload(
+        username="bench",
+        phone="9999999999",
+        email="bench@example.com",
+        user_email="bench@example.com",
+        user_fname="Bench",
+        user_lname="User",
+        user_address="1 Bench Street",
+        city="Bench",
+        landmark=None,
+        state="Bench",
+        pincode="000000",
+        country="IN",
+        contact_mobile="9999999999",
+        shipping_fee=0,
+        total_amount=100 * lines_per_order,
+        payment_id="bench",
+    )
+
+
+def _bench_payment(number: int, payload: OrderCreatePayload) -> Dict[str, Any]:
+    return {
+        "order_id": f"bench-{number}",
+        "cf_payment_id": f"bench-{number}",
+        "payment_amount": payload.total_amount,
+        "payment_status": "SUCCESS",
+    }
+
+
+def _seed_bench_carts(engine, orders: int, lines_per_order: int) -> None:
+    SQLModel.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        product = Products(product_name="bench", price="100", thumbnail="bench.png")
+        db.add(product)
+        db.commit()
+        for number in range(orders):
+            for _ in range(lines_per_order):
+                db.add(Carts(product_id=product.id, session_id=f"bench-{number}"))
+        db.commit()
+
+
+def _scratch_path() -> str:
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    return path
+
+
+def benchmark_checkout(orders: int = 200, lines_per_order: int = 3) -> float:
+    """Place `orders` checkouts through place_order; returns checkouts per second."""
+    payload = _bench_payload(lines_per_order)
+    path = _scratch_path()
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        _seed_bench_carts(engine, orders, lines_per_order)
+        ScratchSession = sessionmaker(autoflush=False, bind=engine)
+        started = time.perf_counter()
+        for number in range(orders):
+            with ScratchSession() as db:
+                place_order(
+                    db, f"bench-{number}", payload, _bench_payment(number, payload)
+                )
+        return orders / (time.perf_counter() - started)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+def benchmark_loop_latency(
+    orders: int = 200, concurrency: int = 10, lines_per_order: int = 3
+) -> Dict[str, Dict[str, float]]:
+    """
+    Run `orders` checkouts, `concurrency` at a time, inside one event loop
+    while a probe stands in for unrelated requests: it sleeps 1ms and records
+    how late it wakes up. Returns p50/p99/max probe delay in milliseconds,
+    once with checkouts on a sync Session called from async code and once
+    through AsyncSession.run_sync (get_async_db).
+    """
+    payload = _bench_payload(lines_per_order)
+
+    async def probe(delays: List[float], done: asyncio.Event) -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            delays.append((time.perf_counter() - started - 0.001) * 1000)
+
+    async def run(checkout) -> Dict[str, float]:
+        delays: List[float] = []
+        done = asyncio.Event()
+        probe_task = asyncio.create_task(probe(delays, done))
+        pending = iter(range(orders))
+
+        async def worker() -> None:
+            for number in pending:
+                await checkout(number)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        done.set()
+        await probe_task
+        delays.sort()
+        return {
+            "p50_ms": statistics.median(delays),
+            "p99_ms": delays[int(len(delays) * 0.99) - 1],
+            "max_ms": delays[-1],
+        }
+
+    results = {}
+    for mode in ("sync", "async"):
+        path = _scratch_path()
+        engine = create_engine(f"sqlite:///{path}")
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            _seed_bench_carts(engine, orders, lines_per_order)
+            ScratchSession = sessionmaker(autoflush=False, bind=engine)
+            AsyncScratchSession = async_sessionmaker(
+                bind=async_engine, autoflush=False, expire_on_commit=False
+            )
+
+            async def sync_checkout(number: int) -> None:
+                with ScratchSession() as db:
+                    place_order(
+                        db, f"bench-{number}", payload, _bench_payment(number, payload)
+                    )
+                await asyncio.sleep(0)
+
+            async def async_checkout(number: int) -> None:
+                async with AsyncScratchSession() as db:
+                    await db.run_sync(
+                        place_order,
+                        f"bench-{number}",
+                        payload,
+                        _bench_payment(number, payload),
+                    )
+
+            async def measure() -> Dict[str, float]:
+                try:
+                    return await run(
+                        sync_checkout if mode == "sync" else async_checkout
+                    )
+                finally:
+                    await async_engine.dispose()
+
+            results[mode] = asyncio.run(measure())
+        finally:
+            engine.dispose()
+            os.remove(path)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark order checkout")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--lines-per-order", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    per_second = benchmark_checkout(args.orders, args.lines_per_order)
+    print(f"place_order: {per_second:.1f} checkouts/s")
+    latency = benchmark_loop_latency(args.orders, args.concurrency, args.lines_per_order)
+    for mode, delays in latency.items():
+        print(
+            f"{mode}: probe delay p50 {delays['p50_ms']:.2f}ms "
+            f"p99 {delays['p99_ms']:.2f}ms max {delays['max_ms']:.2f}ms"
+        )